@@ -0,0 +1,158 @@
+import time
+
+# Level-of-detail tiers
+TIER_NEAR = 0
+TIER_MID = 1
+TIER_FAR = 2
+
+
+class AIScheduler():
+    def __init__(self, near_distance=400, mid_distance=1000, mid_interval=4, budget_ms=4.0, max_ticks=8,
+                 min_updates=8):
+        """
+        Decide which enemies run their AI each frame
+
+        Near enemies (close to the player or inside the view) are due every
+        frame. Mid enemies are due every mid_interval frames and catch up with
+        scaled movement. Far enemies are dormant until they come back into
+        range or an event wakes them. Intervals count simulation ticks, one
+        update() call each.
+
+        All due updates share a time budget per rendered frame, started by
+        begin_frame(), so a frame that catches up several ticks does not spend
+        it once per tick. Near enemies go first, then mid ones, each tier
+        oldest-first so none of them starve. The min_updates oldest near
+        enemies run on every tick even when the budget is spent; the others
+        are deferred. Without begin_frame() every update() gets a budget of
+        its own.
+
+        Args:
+            near_distance: Distance to the player for the near tier
+            mid_distance: Distance to the player for the mid tier
+            mid_interval: Frames between updates of mid tier enemies
+            budget_ms: Time budget per rendered frame for all enemy updates
+            max_ticks: Upper limit on frames caught up in a single update
+            min_updates: Near enemies updated every frame regardless of the budget
+        """
+        self.near_distance = near_distance
+        self.mid_distance = mid_distance
+        self.mid_interval = mid_interval
+        self.budget_ms = budget_ms
+        self.max_ticks = max_ticks
+        self.min_updates = min_updates
+
+        self.frame = 0
+        self.last_update = {}
+        self.dormant = set()
+        # End of the current frame's budget, set by begin_frame()
+        self.deadline = None
+
+        # Stats from the last frame, handy for the debug overlay
+        self.updated_count = 0
+        self.deferred_count = 0
+
+        # Optional profiler timing every enemy update (see FrameProfiler.time_enemy)
+        self.enemy_timer = None
+
+    def get_tier(self, enemy, player_pos, view_rect=None):
+        """Classify an enemy by distance to the player and the view"""
+        if view_rect is not None and view_rect.colliderect(enemy.rect):
+            return TIER_NEAR
+
+        dx = enemy.rect.centerx - player_pos[0]
+        dy = enemy.rect.centery - player_pos[1]
+        distance_sq = dx * dx + dy * dy
+        if distance_sq <= self.near_distance * self.near_distance:
+            return TIER_NEAR
+        if distance_sq <= self.mid_distance * self.mid_distance:
+            return TIER_MID
+        return TIER_FAR
+
+    def wake(self, enemy):
+        """Wake a dormant enemy so it is scheduled again"""
+        if enemy in self.dormant:
+            self.dormant.discard(enemy)
+            self.last_update[enemy] = self.frame
+
+    def wake_all(self):
+        """Wake every dormant enemy, e.g. after a global event"""
+        for enemy in list(self.dormant):
+            self.wake(enemy)
+
+    def reset(self):
+        """Forget all scheduling state, including enemies of a previous level"""
+        self.frame = 0
+        self.last_update = {}
+        self.dormant = set()
+        self.deadline = None
+
+    def begin_frame(self):
+        """Start the time budget of a rendered frame, shared by all its ticks"""
+        self.deadline = time.perf_counter() + self.budget_ms / 1000
+
+    def update_enemy(self, enemy, player_pos, ticks):
+        """Run one enemy's AI, through the profiler when per-enemy timing is on"""
+        if self.enemy_timer is None:
+            enemy.update(player_pos, ticks)
+        else:
+            self.enemy_timer.time_enemy(enemy, player_pos, ticks)
+
+    def update(self, enemies, player_pos, view_rect=None):
+        """
+        Run the AI for the enemies that are due this tick
+
+        Args:
+            enemies: Collection of Enemy sprites (e.g. a sprite Group)
+            player_pos: Tuple (x, y) of the player
+            view_rect: Optional pygame Rect of the camera in world coordinates
+        """
+        self.frame += 1
+        deadline = self.deadline
+        if deadline is None:
+            deadline = time.perf_counter() + self.budget_ms / 1000
+
+        near = []
+        due = []
+        count = 0
+        for enemy in enemies:
+            count += 1
+            tier = self.get_tier(enemy, player_pos, view_rect)
+            last = self.last_update.get(enemy)
+
+            if tier == TIER_FAR:
+                # Dormant enemies are frozen rather than catching up later
+                if enemy not in self.dormant:
+                    self.dormant.add(enemy)
+                continue
+
+            if enemy in self.dormant or last is None:
+                self.dormant.discard(enemy)
+                last = self.frame - 1
+                self.last_update[enemy] = last
+
+            if tier == TIER_NEAR:
+                near.append(enemy)
+            elif self.frame - last >= self.mid_interval:
+                due.append(enemy)
+
+        # Near tier first, then mid; each oldest first, until the frame budget is spent
+        near.sort(key=self.last_update.__getitem__)
+        due.sort(key=self.last_update.__getitem__)
+        due = near + due
+        updated = 0
+        for enemy in due:
+            if updated >= self.min_updates and time.perf_counter() > deadline:
+                break
+            ticks = min(self.frame - self.last_update[enemy], self.max_ticks)
+            self.update_enemy(enemy, player_pos, ticks)
+            self.last_update[enemy] = self.frame
+            updated += 1
+
+        self.updated_count = updated
+        self.deferred_count = len(due) - updated
+
+        # Forget enemies that were removed, so they are not kept alive here
+        if len(self.last_update) > count or len(self.dormant) > count:
+            present = set(enemies)
+            self.last_update = {enemy: last for enemy, last in self.last_update.items() if enemy in present}
+            self.dormant &= present
@@ -0,0 +1,189 @@
+import os
+import random
+import pygame as pg
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SPECKLE_COUNT = 200
+# Speckles per pixel for chunked backgrounds, matching the default 40x24 tile map
+SPECKLE_DENSITY = SPECKLE_COUNT / (1280 * 768)
+
+# Bumped whenever generation changes, so stale files in the disk cache are not used
+GENERATOR_VERSION = 2
+
+# Last generated background, keyed by (width, height, seed); only one is kept
+# since a full-map Surface is large and restarts only need the current one
+_cache = {}
+
+
+def backend_name():
+    """Tag of the generator in use; the NumPy and drawing backends give different images"""
+    return "numpy" if np is not None else "draw"
+
+
+def cache_path(cache_dir, width, height, seed):
+    """File used to store a generated background on disk"""
+    return os.path.join(cache_dir, f"background_v{GENERATOR_VERSION}_{backend_name()}_{width}x{height}_{seed}.png")
+
+
+def create_background(width, height, seed=None, cache_dir=None):
+    """
+    Create the procedural map background
+
+    Backgrounds with a seed are cached in memory and, when cache_dir is
+    given, on disk, so restarts and later launches skip generation.
+
+    Args:
+        width, height: Size of the background in pixels
+        seed: Optional seed; None gives a fresh random background every time
+        cache_dir: Optional directory for the on-disk cache
+
+    Returns:
+        pygame Surface
+    """
+    key = (width, height, seed)
+    if seed is not None and key in _cache:
+        return _cache[key]
+
+    path = cache_path(cache_dir, width, height, seed) if cache_dir and seed is not None else None
+    background = None
+    if path and os.path.exists(path):
+        try:
+            background = pg.image.load(path)
+        except pg.error as e:
+            print(f"Error loading cached background: {e}")
+
+    if background is None:
+        if np is not None:
+            background = generate_background_array(width, height, seed)
+        else:
+            background = generate_background_draw(width, height, seed)
+
+        if path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                pg.image.save(background, path)
+            except (OSError, pg.error) as e:
+                print(f"Error saving cached background: {e}")
+
+    if pg.display.get_surface():
+        background = background.convert()
+
+    if seed is not None:
+        _cache.clear()
+        _cache[key] = background
+    return background
+
+
+def generate_background_array(width, height, seed=None):
+    """Generate the gradient, noise and speckles with NumPy in a few array operations"""
+    rng = np.random.default_rng(seed)
+    pixels = _gradient_pixels(rng, 0, width, height, height)
+
+    xs = rng.integers(0, width + 1, SPECKLE_COUNT)
+    ys = rng.integers(0, height + 1, SPECKLE_COUNT)
+    _stamp_speckles(pixels, rng, xs, ys)
+
+    background = pg.Surface((width, height))
+    pg.surfarray.blit_array(background, pixels)
+    return background
+
+
+def create_background_chunk(x, y, width, height, map_height, seed=None):
+    """
+    Generate one region of a chunked background
+
+    The gradient follows the whole map height and speckles stay inside the
+    region, so neighbouring chunks line up without seams.
+
+    Args:
+        x, y: Top-left of the region in map pixels
+        width, height: Size of the region
+        map_height: Height of the whole map, used for the gradient
+        seed: Optional seed; each region derives its own stream from it
+
+    Returns:
+        pygame Surface of the region
+    """
+    count = max(1, round(SPECKLE_DENSITY * width * height))
+    if np is None:
+        rng = random.Random(f"{seed}:{x}:{y}")
+        chunk = pg.Surface((width, height))
+        for row in range(height):
+            color_intensity = int(30 + ((y + row) / map_height) * 40)
+            pg.draw.line(chunk, (color_intensity, color_intensity + 10, color_intensity + 20), (0, row), (width, row))
+        for _ in range(count):
+            radius = rng.randint(2, 8)
+            color = (rng.randint(40, 80), rng.randint(50, 90), rng.randint(60, 100))
+            pg.draw.circle(chunk, color, (rng.randint(radius, max(radius, width - radius)),
+                                          rng.randint(radius, max(radius, height - radius))), radius)
+        return chunk
+
+    rng = np.random.default_rng(None if seed is None else (seed, x, y))
+    pixels = _gradient_pixels(rng, y, width, height, map_height)
+
+    margin = 8
+    xs = rng.integers(margin, max(margin, width - margin) + 1, count)
+    ys = rng.integers(margin, max(margin, height - margin) + 1, count)
+    _stamp_speckles(pixels, rng, xs, ys)
+
+    chunk = pg.Surface((width, height))
+    pg.surfarray.blit_array(chunk, pixels)
+    return chunk
+
+
+def _gradient_pixels(rng, top, width, height, map_height):
+    """Build the (width, height, 3) gradient array for rows top..top + height"""
+    # Vertical gradient, one value per row, plus fine noise so large areas
+    # do not look flat; everything stays in uint8 range (27..93)
+    intensity = (27 + np.arange(top, top + height) / map_height * 40).astype(np.uint8)
+    base = rng.integers(0, 7, size=(width, height), dtype=np.uint8)
+    base += intensity[None, :]
+
+    pixels = np.empty((width, height, 3), dtype=np.uint8)
+    pixels[:, :, 0] = base
+    pixels[:, :, 1] = base + 10
+    pixels[:, :, 2] = base + 20
+    return pixels
+
+
+def _stamp_speckles(pixels, rng, xs, ys):
+    """Stamp the speckle disks into the pixel array, one broadcast per radius"""
+    width, height = pixels.shape[:2]
+    count = len(xs)
+    radii = rng.integers(2, 9, count)
+    colors = np.stack([rng.integers(40, 81, count),
+                       rng.integers(50, 91, count),
+                       rng.integers(60, 101, count)], axis=1).astype(np.uint8)
+
+    for radius in np.unique(radii):
+        chosen = radii == radius
+        # Pixel offsets of a disk of this radius, applied to every speckle that has it
+        offsets = np.arange(-radius, radius + 1)
+        dx, dy = np.nonzero(offsets[:, None] ** 2 + offsets[None, :] ** 2 <= radius * radius)
+        px = xs[chosen, None] + (dx - radius)[None, :]
+        py = ys[chosen, None] + (dy - radius)[None, :]
+        inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+        color = np.broadcast_to(colors[chosen][:, None, :], px.shape + (3,))
+        pixels[px[inside], py[inside]] = color[inside]
+
+
+def generate_background_draw(width, height, seed=None):
+    """Fallback generator using pygame drawing when NumPy is not available"""
+    rng = random.Random(seed)
+    background = pg.Surface((width, height))
+    for y in range(height):
+        color_intensity = int(30 + (y / height) * 40)
+        pg.draw.line(background, (color_intensity, color_intensity + 10, color_intensity + 20), (0, y), (width, y))
+
+    for _ in range(SPECKLE_COUNT):
+        x = rng.randint(0, width)
+        y = rng.randint(0, height)
+        radius = rng.randint(2, 8)
+        color = (rng.randint(40, 80), rng.randint(50, 90), rng.randint(60, 100))
+        pg.draw.circle(background, color, (x, y), radius)
+
+    return background
@@ -0,0 +1,323 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame as pg
+import constants as c
+from controls import KeyState
+from dungeon_gen import generate_dungeon
+from game import Game, DEFAULT_TUNING, create_dungeon_map
+from pathfinding import FlowField, UNREACHED
+
+# Pixels off the next tile's center the bot tolerates before correcting an axis
+STEER_DEAD_ZONE = 4
+# Frames without movement before the bot tries a random direction
+STUCK_FRAMES = 20
+# Frames without getting closer to the target before the bot stops evading
+# (e.g. an enemy wedged in the only corridor) and for how long
+PATIENCE_FRAMES = 90
+BRAVE_FRAMES = 90
+
+
+class TreasureBot():
+    def __init__(self, game, evade_distance=48, seed=None):
+        """
+        Scripted player that walks to the closest reachable treasure and dodges close enemies
+
+        It uses its own flow field over the level's collision grid, so it can
+        be used as the input source of a headless Game.
+
+        Args:
+            game: Game whose player is driven
+            evade_distance: Enemies closer than this make the bot step away
+            seed: Seed for the moves used to get unstuck
+        """
+        self.game = game
+        self.evade_distance = evade_distance
+        self.rng = random.Random(seed)
+        self.flow_field = None
+        self.reach = None
+        self.grid = None
+        self.target = None
+        self.last_pos = None
+        self.still_frames = 0
+        self.unstuck_keys = None
+        self.unstuck_frames = 0
+        self.best_distance = None
+        self.stalled_frames = 0
+        self.brave_frames = 0
+
+    def choose_target(self, pos):
+        """Pick the treasure with the shortest path from pos, or None if none is reachable"""
+        self.reach.compute(*self.reach.tile_of(*pos))
+        best = None
+        best_distance = None
+        for treasure in self.game.treasure_group:
+            col, row = self.reach.tile_of(*treasure.rect.center)
+            distance = self.reach.distance[row * self.grid.cols + col]
+            if distance != UNREACHED and (best_distance is None or distance < best_distance):
+                best, best_distance = treasure, distance
+        return best
+
+    def track_progress(self, pos):
+        """Count frames without getting closer to the target, turning brave when out of patience"""
+        col, row = self.flow_field.tile_of(*pos)
+        distance = self.flow_field.distance[row * self.grid.cols + col]
+        if self.best_distance is None or distance < self.best_distance:
+            self.best_distance = distance
+            self.stalled_frames = 0
+            return
+
+        self.stalled_frames += 1
+        if self.stalled_frames > PATIENCE_FRAMES:
+            self.stalled_frames = 0
+            self.brave_frames = BRAVE_FRAMES
+
+    def keys_towards(self, pos, target):
+        """Keys moving from pos towards target, ignoring axes already close enough"""
+        pressed = []
+        if target[0] > pos[0] + STEER_DEAD_ZONE:
+            pressed.append(pg.K_d)
+        elif target[0] < pos[0] - STEER_DEAD_ZONE:
+            pressed.append(pg.K_a)
+        if target[1] > pos[1] + STEER_DEAD_ZONE:
+            pressed.append(pg.K_s)
+        elif target[1] < pos[1] - STEER_DEAD_ZONE:
+            pressed.append(pg.K_w)
+        return pressed
+
+    def get_keys(self):
+        game = self.game
+        player = game.player
+        pos = player.rect.center
+
+        # The level was rebuilt, so the old field no longer matches
+        if self.grid is not game.collision_grid:
+            self.grid = game.collision_grid
+            self.flow_field = FlowField(self.grid)
+            self.reach = FlowField(self.grid)
+            self.target = None
+
+        if self.unstuck_frames > 0:
+            self.unstuck_frames -= 1
+            return KeyState(self.unstuck_keys)
+
+        if pos == self.last_pos:
+            self.still_frames += 1
+        else:
+            self.still_frames = 0
+        self.last_pos = pos
+        if self.still_frames > STUCK_FRAMES:
+            self.still_frames = 0
+            self.unstuck_keys = self.rng.choice(((pg.K_w,), (pg.K_s,), (pg.K_a,), (pg.K_d,)))
+            self.unstuck_frames = self.rng.randint(5, 15)
+            return KeyState(self.unstuck_keys)
+
+        # Step away from an enemy that is about to hit
+        if self.brave_frames > 0:
+            self.brave_frames -= 1
+        elif not player.invulnerable and self.evade_distance > 0:
+            nearby = game.enemy_hash.query_radius(pos, self.evade_distance)
+            if nearby and nearby[0][1] < self.evade_distance:
+                enemy = nearby[0][0]
+                away = (2 * pos[0] - enemy.rect.centerx, 2 * pos[1] - enemy.rect.centery)
+                return KeyState(self.keys_towards(pos, away))
+
+        if self.target is None or not self.target.alive():
+            self.target = self.choose_target(pos)
+            self.best_distance = None
+            if self.target is None:
+                return KeyState()
+
+        target = self.target.rect.center
+        self.flow_field.update(target)
+        self.track_progress(pos)
+        direction = self.flow_field.direction_at(*pos)
+        if direction is None:
+            # Same tile as the treasure, or no path: head straight for it
+            return KeyState(self.keys_towards(pos, target))
+
+        # Aim at the center of the next tile so the player does not snag on corners
+        tile_size = self.grid.tile_size
+        col, row = self.flow_field.tile_of(*pos)
+        next_col = col + (direction[0] > 0.3) - (direction[0] < -0.3)
+        next_row = row + (direction[1] > 0.3) - (direction[1] < -0.3)
+        waypoint = ((next_col + 0.5) * tile_size, (next_row + 0.5) * tile_size)
+        return KeyState(self.keys_towards(pos, waypoint))
+
+
+def load_map(map_name, seed):
+    """Return the tile rows for a session: the built-in map or a seeded dungeon"""
+    if map_name == "classic":
+        return create_dungeon_map()
+    return generate_dungeon(c.DUNGEON_WIDTH, c.DUNGEON_HEIGHT, seed)
+
+
+def run_session(task):
+    """
+    Play one headless game with the treasure bot
+
+    Deaths restart the level, as pressing R would, until all treasures are
+    collected, max_deaths is exceeded or the tick limit is reached.
+
+    Args:
+        task: Tuple (tuning, seed, map_name, max_ticks, max_deaths)
+
+    Returns:
+        Dict of outcome metrics
+    """
+    tuning, seed, map_name, max_ticks, max_deaths = task
+    world_data = load_map(map_name, seed)
+
+    game = Game(dt=1000 / c.FPS, level_source=lambda: world_data, tuning=tuning, seed=seed)
+    game.input = TreasureBot(game, seed=seed)
+    # Without a time budget the scheduler does not depend on machine speed
+    game.ai_scheduler.budget_ms = math.inf
+
+    deaths = 0
+    damage = 0
+    first_death = None
+    best_treasures = 0
+    victory = False
+    while game.ticks < max_ticks:
+        health = game.player.health
+        game.step()
+        damage += max(0, health - game.player.health)
+        best_treasures = max(best_treasures, game.player.treasures_collected)
+
+        if game.is_victory():
+            victory = True
+            break
+        if game.is_game_over():
+            deaths += 1
+            if first_death is None:
+                first_death = game.ticks / c.FPS
+            if deaths > max_deaths:
+                break
+            game.reset()
+
+    result = {
+        "seed": seed,
+        "victory": victory,
+        "time_to_victory": game.ticks / c.FPS if victory else None,
+        "ticks": game.ticks,
+        "deaths": deaths,
+        "damage_taken": damage,
+        "first_death": first_death,
+        "treasures": best_treasures,
+        "treasure_total": len(game.level_treasures),
+    }
+    game.close()
+    return result
+
+
+def init_worker():
+    """Process pool initializer: no display is ever opened by the workers"""
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pg.init()
+
+
+def parse_sweep(specs):
+    """
+    Turn ["chase_range=200,300", "speed=2,3"] into a list of tuning dicts
+
+    Returns:
+        Cartesian product of all swept values, one dict per combination
+    """
+    names = []
+    values = []
+    for spec in specs:
+        name, _, raw = spec.partition("=")
+        if name not in DEFAULT_TUNING or not raw:
+            raise ValueError(f"Bad sweep '{spec}', expected one of {', '.join(DEFAULT_TUNING)}=v1,v2,...")
+        cast = type(DEFAULT_TUNING[name])
+        names.append(name)
+        values.append([cast(value) for value in raw.split(",")])
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def aggregate(results):
+    """Summarize the sessions of one parameter combination"""
+    wins = [result["time_to_victory"] for result in results if result["victory"]]
+    first_deaths = [result["first_death"] for result in results if result["first_death"] is not None]
+    return {
+        "runs": len(results),
+        "win_rate": len(wins) / len(results),
+        "time_to_victory_mean": statistics.fmean(wins) if wins else None,
+        "time_to_victory_median": statistics.median(wins) if wins else None,
+        "damage_mean": statistics.fmean(result["damage_taken"] for result in results),
+        "deaths_mean": statistics.fmean(result["deaths"] for result in results),
+        "death_rate": sum(1 for result in results if result["deaths"]) / len(results),
+        "first_death_median": statistics.median(first_deaths) if first_deaths else None,
+        "treasure_ratio": statistics.fmean(result["treasures"] / max(1, result["treasure_total"]) for result in results),
+    }
+
+
+def format_value(value, digits=1):
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo balance runs with a scripted bot")
+    parser.add_argument("--sweep", action="append", default=[],
+                        help="Parameter values to sweep, e.g. chase_range=200,300,400 (repeatable)")
+    parser.add_argument("--runs", type=int, default=100, help="Seeded sessions per parameter combination")
+    parser.add_argument("--seed", type=int, default=1, help="First seed; sessions use seed .. seed + runs - 1")
+    parser.add_argument("--map", choices=("classic", "dungeon"), default="dungeon",
+                        help="Built-in map or a generated dungeon per seed")
+    parser.add_argument("--max-seconds", type=float, default=300, help="Game-time limit per session")
+    parser.add_argument("--max-deaths", type=int, default=3, help="Deaths before a session is given up")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--output", default=None, help="Write aggregated and per-run results to this JSON file")
+    args = parser.parse_args()
+
+    try:
+        combinations = parse_sweep(args.sweep)
+    except ValueError as e:
+        print(e)
+        return 2
+
+    max_ticks = int(args.max_seconds * c.FPS)
+    tasks = [(combination, args.seed + run, args.map, max_ticks, args.max_deaths)
+             for combination in combinations for run in range(args.runs)]
+    # Big chunks keep the per-task overhead low while still balancing the load
+    chunksize = max(1, len(tasks) // (args.workers * 8))
+
+    print(f"{len(tasks)} sessions, {len(combinations)} combination(s), {args.workers} worker(s)")
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as executor:
+        results = list(executor.map(run_session, tasks, chunksize=chunksize))
+    elapsed = time.perf_counter() - start
+    simulated = sum(result["ticks"] for result in results) / c.FPS
+    print(f"Done in {elapsed:.1f}s, {simulated / 60:.0f} game-minutes simulated, "
+          f"{len(results) / elapsed * 60:.0f} runs/minute")
+
+    summary = []
+    for i, combination in enumerate(combinations):
+        runs = results[i * args.runs:(i + 1) * args.runs]
+        summary.append({"tuning": dict(DEFAULT_TUNING, **combination), "stats": aggregate(runs), "runs": runs})
+
+    print(f"{'parameters':<32} {'win%':>6} {'t_win':>7} {'damage':>7} {'deaths':>7} {'died%':>6}")
+    for entry in summary:
+        label = ", ".join(f"{name}={value}" for name, value in entry["tuning"].items()
+                          if name in combinations[0]) or "defaults"
+        stats = entry["stats"]
+        print(f"{label:<32} {stats['win_rate'] * 100:6.1f} {format_value(stats['time_to_victory_median']):>7} "
+              f"{stats['damage_mean']:7.1f} {stats['deaths_mean']:7.2f} {stats['death_rate'] * 100:6.1f}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"map": args.map, "max_seconds": args.max_seconds, "results": summary}, file, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import pygame as pg
+import constants as c
+from collision import WALL_TILES
+from controls import RandomInput
+
+# Behavior mixes: share of enemies per behavior mode
+BEHAVIOR_MIXES = {
+    "chase": {"chase": 1.0},
+    "mixed": {"chase": 0.4, "patrol": 0.2, "guard": 0.2, "wander": 0.2},
+    "passive": {"patrol": 1 / 3, "guard": 1 / 3, "wander": 1 / 3},
+}
+
+# Scenarios; map "classic" uses the built-in level, anything else is generated
+SCENARIOS = [
+    {"name": "classic", "map": "classic", "mix": "chase", "overlay": False},
+    {"name": "classic_overlay", "map": "classic", "mix": "chase", "overlay": True},
+    {"name": "medium_chase", "width": 120, "height": 80, "enemies": 150, "treasures": 12,
+     "mix": "chase", "wall_density": 0.08, "overlay": False},
+    {"name": "medium_mixed", "width": 120, "height": 80, "enemies": 150, "treasures": 12,
+     "mix": "mixed", "wall_density": 0.08, "overlay": False},
+    {"name": "medium_mixed_overlay", "width": 120, "height": 80, "enemies": 150, "treasures": 12,
+     "mix": "mixed", "wall_density": 0.08, "overlay": True},
+    {"name": "dense_walls", "width": 120, "height": 80, "enemies": 150, "treasures": 12,
+     "mix": "mixed", "wall_density": 0.3, "overlay": False},
+    {"name": "large_passive", "width": 300, "height": 200, "enemies": 1000, "treasures": 40,
+     "mix": "passive", "wall_density": 0.1, "overlay": False},
+]
+
+# Timed sections, in the order they run each frame
+SECTIONS = ("player_update", "flow_field", "field_of_view", "fog", "enemy_update", "draw_background",
+            "draw_waypoints", "draw_walls", "draw_fog", "draw_treasures", "draw_enemies")
+
+
+def generate_map(width, height, wall_density, enemies, treasures, seed):
+    """
+    Generate a map with randomly scattered walls for benchmarking
+
+    Args:
+        width, height: Size of the map in tiles
+        wall_density: Chance for an inner tile to be a wall
+        enemies, treasures: Number of enemies and treasures to place
+        seed: Seed for the layout
+
+    Returns:
+        List of strings, one per row
+    """
+    rng = random.Random(seed)
+    rows = [['W'] * width for _ in range(height)]
+    for y in range(1, height - 1):
+        for x in range(1, width - 1):
+            rows[y][x] = rng.choice(WALL_TILES) if rng.random() < wall_density else '.'
+
+    # Clear area around the player spawn
+    player_x, player_y = width // 2, height // 2
+    for y in range(player_y - 1, player_y + 2):
+        for x in range(player_x - 1, player_x + 2):
+            rows[y][x] = '.'
+    rows[player_y][player_x] = 'P'
+
+    free = [(x, y) for y in range(1, height - 1) for x in range(1, width - 1) if rows[y][x] == '.']
+    rng.shuffle(free)
+    for x, y in free[:treasures]:
+        rows[y][x] = 'T'
+    for x, y in free[treasures:treasures + enemies]:
+        rows[y][x] = 'E'
+    return [''.join(row) for row in rows]
+
+
+def apply_behavior_mix(enemies, mix, seed):
+    """Switch a share of the enemies from chasing to patrol/guard/wander"""
+    rng = random.Random(seed)
+    modes = list(mix)
+    weights = [mix[mode] for mode in modes]
+    for enemy in enemies:
+        mode = rng.choices(modes, weights)[0]
+        if mode == "chase":
+            continue
+        enemy.set_chase_mode(False)
+        if mode == "guard":
+            enemy.set_guard_position(enemy.rect.center)
+        else:
+            enemy.set_behavior(mode)
+
+
+def summarize(samples):
+    """Reduce a list of timings in seconds to stats in milliseconds"""
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return {
+        "mean_ms": statistics.fmean(samples) * 1000,
+        "median_ms": statistics.median(samples) * 1000,
+        "p95_ms": p95 * 1000,
+        "min_ms": samples[0] * 1000,
+        "max_ms": samples[-1] * 1000,
+        "samples": len(samples),
+    }
+
+
+def run_scenario(scenario, screen, frames=300, warmup=30, init_runs=3, seed=1):
+    """
+    Time the hot paths of one scenario
+
+    Args:
+        scenario: Scenario dict from SCENARIOS
+        screen: Surface to draw on
+        frames: Number of timed frames
+        warmup: Frames run before timing starts
+        init_runs: Number of timed level initializations, each run once cold and once warm
+        seed: Seed for the map, enemy behavior and player input
+
+    Returns:
+        Dict of section name -> timing stats
+    """
+    # Backgrounds are cached in a throwaway directory, never in the caller's one
+    saved_cache_dir = c.BACKGROUND_CACHE_DIR
+    with tempfile.TemporaryDirectory(prefix="bench_backgrounds_") as cache_dir:
+        c.BACKGROUND_CACHE_DIR = cache_dir
+        try:
+            return time_scenario(scenario, screen, frames, warmup, init_runs, seed)
+        finally:
+            c.BACKGROUND_CACHE_DIR = saved_cache_dir
+
+
+def time_scenario(scenario, screen, frames, warmup, init_runs, seed):
+    """Run the timings of run_scenario, with c.BACKGROUND_CACHE_DIR pointing at an empty directory"""
+    # game.py is imported late so the video driver is already configured
+    from game import Game, create_dungeon_map
+    import background
+
+    if scenario.get("map") == "classic":
+        world_data = create_dungeon_map()
+    else:
+        world_data = generate_map(scenario["width"], scenario["height"], scenario["wall_density"],
+                                  scenario["enemies"], scenario["treasures"], seed)
+
+    game = Game(screen, RandomInput(seed), level_source=lambda: world_data, seed=seed)
+    game.show_waypoints = scenario["overlay"]
+
+    # Cold runs start without any cached background, in memory or on disk;
+    # warm runs rebuild the same level with both caches filled
+    cache_root = c.BACKGROUND_CACHE_DIR
+    cold_samples = []
+    warm_samples = []
+    for run in range(init_runs):
+        background._cache.clear()
+        c.BACKGROUND_CACHE_DIR = os.path.join(cache_root, f"cold_{run}")
+        start = time.perf_counter()
+        game.initialize()
+        cold_samples.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        game.initialize()
+        warm_samples.append(time.perf_counter() - start)
+    apply_behavior_mix(game.level_enemies, BEHAVIOR_MIXES[scenario["mix"]], seed)
+    if game.enemy_swarm:
+        game.enemy_swarm.reset()
+
+    samples = {section: [] for section in SECTIONS}
+    timer = time.perf_counter
+    for frame in range(warmup + frames):
+        keys = game.input.get_keys()
+        player_pos = game.player.rect.center
+        timings = []
+
+        start = timer()
+        game.player_group.update(keys, game.walls, game.treasure_group, game.enemy_group, game.collision_grid,
+                                 game.treasure_hash, game.enemy_hash)
+        timings.append(timer() - start)
+        game.treasure_group.update()
+        game.treasure_hash.update(game.treasure_group)
+
+        start = timer()
+        game.flow_field.update(player_pos)
+        timings.append(timer() - start)
+
+        # Enemies detect the player through the field of view, so it is
+        # updated before them as in Game.update
+        start = timer()
+        if game.field_of_view is not None:
+            game.field_of_view.update(player_pos)
+        timings.append(timer() - start)
+
+        start = timer()
+        if game.fog is not None:
+            game.fog.update()
+        timings.append(timer() - start)
+
+        # Same dispatch as Game.update: swarm, LOD scheduler or plain loop
+        start = timer()
+        game.ai_scheduler.begin_frame()
+        game.update_enemies(player_pos)
+        timings.append(timer() - start)
+
+        game.update_camera()
+        screen.fill((20, 20, 30))
+
+        start = timer()
+        game.world.draw(screen, game.camera_x, game.camera_y)
+        timings.append(timer() - start)
+
+        start = timer()
+        if game.show_waypoints:
+            game.world.draw_waypoints(screen, game.camera_x, game.camera_y, (255, 215, 0), 8)
+        timings.append(timer() - start)
+
+        for draw in (game.draw_walls, game.draw_fog, game.draw_treasures, game.draw_enemies):
+            start = timer()
+            draw(screen)
+            timings.append(timer() - start)
+
+        if frame >= warmup:
+            for section, elapsed in zip(SECTIONS, timings):
+                samples[section].append(elapsed)
+
+    results = {"initialize_cold": summarize(cold_samples), "initialize": summarize(warm_samples)}
+    for section in SECTIONS:
+        if section == "draw_waypoints" and not game.show_waypoints:
+            continue
+        if section == "field_of_view" and game.field_of_view is None:
+            continue
+        if section in ("fog", "draw_fog") and game.fog is None:
+            continue
+        results[section] = summarize(samples[section])
+    game.close()
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """
+    Compare median timings against a baseline run
+
+    Returns:
+        List of (scenario, section, baseline_ms, current_ms) regressions
+    """
+    regressions = []
+    for name, sections in results["scenarios"].items():
+        base_sections = baseline.get("scenarios", {}).get(name, {}).get("timings", {})
+        for section, stats in sections["timings"].items():
+            base = base_sections.get(section)
+            if base is None:
+                continue
+            current_ms = stats["median_ms"]
+            base_ms = base["median_ms"]
+            if current_ms > base_ms * (1 + threshold) and current_ms - base_ms > min_delta_ms:
+                regressions.append((name, section, base_ms, current_ms))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark simulation and rendering hot paths")
+    parser.add_argument("--scenario", action="append", help="Only run the named scenario (repeatable)")
+    parser.add_argument("--list", action="store_true", help="List scenarios and exit")
+    parser.add_argument("--frames", type=int, default=300, help="Timed frames per scenario")
+    parser.add_argument("--warmup", type=int, default=30, help="Untimed frames before measuring")
+    parser.add_argument("--init-runs", type=int, default=3, help="Timed level initializations per scenario")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--baseline", help="Earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="Allowed relative slowdown of a median before failing")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Ignore slowdowns smaller than this, to filter out timer noise")
+    parser.add_argument("--display", action="store_true", help="Draw to a real window instead of the dummy driver")
+    args = parser.parse_args()
+
+    if args.list:
+        for scenario in SCENARIOS:
+            print(scenario["name"])
+        return 0
+
+    scenarios = SCENARIOS
+    if args.scenario:
+        scenarios = [scenario for scenario in SCENARIOS if scenario["name"] in args.scenario]
+        unknown = set(args.scenario) - {scenario["name"] for scenario in scenarios}
+        if unknown:
+            print(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+            return 2
+
+    if not args.display:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pg.init()
+    screen = pg.display.set_mode((c.SCREEN_WIDTH, c.SCREEN_HEIGHT))
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pg.version.ver,
+            "platform": platform.platform(),
+            "video_driver": pg.display.get_driver(),
+            "frames": args.frames,
+            "seed": args.seed,
+        },
+        "scenarios": {},
+    }
+
+    for scenario in scenarios:
+        timings = run_scenario(scenario, screen, args.frames, args.warmup, args.init_runs, args.seed)
+        results["scenarios"][scenario["name"]] = {"params": scenario, "timings": timings}
+
+        print(scenario["name"])
+        for section, stats in timings.items():
+            print(f"  {section:<16} median {stats['median_ms']:8.3f} ms   p95 {stats['p95_ms']:8.3f} ms")
+
+    pg.quit()
+
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        try:
+            with open(args.baseline) as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"Error loading baseline: {e}")
+            return 2
+
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        for name, section, base_ms, current_ms in regressions:
+            print(f"REGRESSION {name}/{section}: {base_ms:.3f} ms -> {current_ms:.3f} ms "
+                  f"(+{(current_ms / base_ms - 1) * 100:.0f}%)")
+        if regressions:
+            return 1
+        print(f"No regressions above {args.threshold * 100:.0f}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+WALL_TILES = ('W', 'B', 'S', 'L', 'I')
+
+
+class CollisionGrid():
+    def __init__(self, cols, rows, tile_size):
+        """
+        Compact occupancy grid of solid tiles
+
+        Args:
+            cols, rows: Size of the grid in tiles
+            tile_size: Size of a single tile in pixels
+        """
+        self.cols = cols
+        self.rows = rows
+        self.tile_size = tile_size
+        # One byte per tile, row-major: 1 = solid, 0 = free
+        self.solid = bytearray(cols * rows)
+
+    @classmethod
+    def from_map(cls, map_data, tile_size, solid_tiles=WALL_TILES):
+        """
+        Build a grid from a list of map rows (strings of tile characters)
+
+        Args:
+            map_data: List of strings, one per row
+            tile_size: Size of a single tile in pixels
+            solid_tiles: Tile characters that block movement
+        """
+        rows = len(map_data)
+        cols = len(map_data[0]) if rows else 0
+        grid = cls(cols, rows, tile_size)
+        for row_index, row in enumerate(map_data):
+            for col_index, tile in enumerate(row):
+                if tile in solid_tiles:
+                    grid.solid[row_index * cols + col_index] = 1
+        return grid
+
+    @classmethod
+    def from_level(cls, level, solid_tiles=WALL_TILES):
+        """
+        Build a grid straight from the tile buffer of a binary level
+
+        The tile codes are mapped to solid flags in a single pass over the
+        buffer, without decoding the rows into strings.
+
+        Args:
+            level: LevelData from level_format.load_level
+            solid_tiles: Tile characters that block movement
+        """
+        grid = cls(level.cols, level.rows, level.tile_size)
+        table = bytes(1 if chr(code) in solid_tiles else 0 for code in range(256))
+        grid.solid = bytearray(level.tiles).translate(table)
+        return grid
+
+    def set_solid(self, col, row, solid=True):
+        """Mark a tile as solid or free"""
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            self.solid[row * self.cols + col] = 1 if solid else 0
+
+    def is_solid(self, col, row):
+        """Check a tile; anything outside the grid counts as solid"""
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return self.solid[row * self.cols + col] == 1
+        return True
+
+    def is_solid_at(self, x, y):
+        """Check the tile under a pixel position"""
+        return self.is_solid(int(x) // self.tile_size, int(y) // self.tile_size)
+
+    def collides_rect(self, rect):
+        """
+        Check if a rect overlaps any solid tile
+
+        Only the handful of tiles under the rect are tested, so the cost
+        does not depend on the size of the map.
+
+        Args:
+            rect: pygame Rect in world coordinates
+
+        Returns:
+            True if the rect touches a solid tile, False otherwise
+        """
+        if rect.width <= 0 or rect.height <= 0:
+            return False
+
+        first_col = rect.left // self.tile_size
+        last_col = (rect.right - 1) // self.tile_size
+        first_row = rect.top // self.tile_size
+        last_row = (rect.bottom - 1) // self.tile_size
+
+        if first_col < 0 or first_row < 0 or last_col >= self.cols or last_row >= self.rows:
+            return True
+
+        solid = self.solid
+        cols = self.cols
+        for row in range(first_row, last_row + 1):
+            offset = row * cols
+            for col in range(first_col, last_col + 1):
+                if solid[offset + col]:
+                    return True
+        return False
@@ -1,3 +1,49 @@
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
-FPS = 60
\ No newline at end of file
+FPS = 60  # Simulation ticks per second
+
+# Frames drawn per second; lower on weak machines, gameplay speed stays the same
+RENDER_FPS = 60
+# Most ticks run before a frame is drawn; when even these fall behind the game slows down
+MAX_TICKS_PER_FRAME = 5
+
+# Update enemies with the batched NumPy swarm backend instead of per-sprite logic
+USE_ENEMY_SWARM = False
+
+# Enemies only detect the player along a clear line of sight, not through walls
+ENEMY_LINE_OF_SIGHT = True
+
+# Darken unexplored tiles and hide what is out of the player's view
+FOG_OF_WAR = True
+
+# Enemy AI level-of-detail scheduling
+AI_LOD_ENABLED = True
+AI_BUDGET_MS = 4.0
+
+# Extra tiles the chase flow field spreads beyond the chase range, for paths around walls
+FLOW_FIELD_MARGIN = 6
+
+# Procedural background generation
+BACKGROUND_SEED = 1
+BACKGROUND_CACHE_DIR = ".cache/backgrounds"
+
+# Chunked streaming for maps too large to hold as one Surface
+STREAMING_MIN_PIXELS = 4096 * 4096
+STREAMING_CHUNK_SIZE = 512
+STREAMING_MAX_CHUNKS = 48
+
+# Procedurally generated levels instead of the built-in map
+PROCEDURAL_LEVELS = False
+DUNGEON_WIDTH = 120
+DUNGEON_HEIGHT = 80
+DUNGEON_SEED = 1
+
+# Frame profiler (F3 overlay, F4 CSV dump, F5 per-enemy timing)
+PROFILER_ENABLED = False
+PROFILER_FRAMES = 600
+
+# Cell size in pixels of the spatial hashes over enemies and treasures
+SPATIAL_CELL_SIZE = 64
+
+# Redraw only the areas of moving sprites and the HUD while the camera is still
+DIRTY_RECTS = False
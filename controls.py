@@ -0,0 +1,80 @@
+import random
+import pygame as pg
+
+# Keys the game reacts to; scripted and random input only deal with these
+GAME_KEYS = (pg.K_w, pg.K_a, pg.K_s, pg.K_d, pg.K_UP, pg.K_DOWN, pg.K_LEFT, pg.K_RIGHT, pg.K_r, pg.K_RETURN)
+MOVE_KEYS = ((), (pg.K_w,), (pg.K_s,), (pg.K_a,), (pg.K_d,),
+             (pg.K_w, pg.K_a), (pg.K_w, pg.K_d), (pg.K_s, pg.K_a), (pg.K_s, pg.K_d))
+
+
+class KeyState():
+    def __init__(self, pressed=()):
+        """
+        Stand-in for pg.key.get_pressed() built from a set of key codes
+
+        Args:
+            pressed: Iterable of pygame key constants that are held down
+        """
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+
+class KeyboardInput():
+    """Read the real keyboard"""
+
+    def get_keys(self):
+        return pg.key.get_pressed()
+
+
+class ScriptedInput():
+    def __init__(self, script, loop=False):
+        """
+        Play back a fixed list of inputs
+
+        Args:
+            script: List of (frames, keys) pairs; keys are held for that many frames
+            loop: Start over when the script ends instead of releasing all keys
+        """
+        self.steps = [(frames, KeyState(keys)) for frames, keys in script]
+        self.loop = loop
+        self.index = 0
+        self.remaining = self.steps[0][0] if self.steps else 0
+        self.idle = KeyState()
+
+    def get_keys(self):
+        while self.index < len(self.steps) and self.remaining <= 0:
+            self.index += 1
+            if self.index == len(self.steps) and self.loop:
+                self.index = 0
+            if self.index < len(self.steps):
+                self.remaining = self.steps[self.index][0]
+
+        if self.index >= len(self.steps):
+            return self.idle
+        self.remaining -= 1
+        return self.steps[self.index][1]
+
+
+class RandomInput():
+    def __init__(self, seed=None, min_hold=10, max_hold=60):
+        """
+        Random walk over the movement keys, holding each choice for a while
+
+        Args:
+            seed: Optional seed for reproducible input
+            min_hold, max_hold: Range of frames a key combination is held
+        """
+        self.rng = random.Random(seed)
+        self.min_hold = min_hold
+        self.max_hold = max_hold
+        self.remaining = 0
+        self.keys = KeyState()
+
+    def get_keys(self):
+        if self.remaining <= 0:
+            self.keys = KeyState(self.rng.choice(MOVE_KEYS))
+            self.remaining = self.rng.randint(self.min_hold, self.max_hold)
+        self.remaining -= 1
+        return self.keys
@@ -0,0 +1,240 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Region codes used while generating
+REGION_NONE = 0
+REGION_ROOM = 1
+REGION_CAVE = 2
+
+CAVE_FILL = 0.45
+CAVE_STEPS = 4
+
+
+def generate_dungeon(width=120, height=80, seed=None, min_leaf=16, cave_chance=0.35,
+                     treasure_count=None, enemy_count=None):
+    """
+    Generate a dungeon with BSP rooms and cellular-automata caves
+
+    The result uses the same tile vocabulary as create_dungeon_map():
+    'W', 'B', 'S', 'L', 'I' walls, 'T' treasure, 'E' enemy, 'P' player, '.' floor.
+
+    Args:
+        width, height: Size of the map in tiles
+        seed: Optional seed for a reproducible map
+        min_leaf: Smallest BSP leaf size in tiles
+        cave_chance: Chance for a leaf to become a cave instead of a room
+        treasure_count: Number of treasures, scaled with the room count when None
+        enemy_count: Number of enemies, scaled with the floor area when None
+
+    Returns:
+        List of strings, one per row
+    """
+    rng = np.random.default_rng(seed)
+    min_leaf = max(6, min_leaf)
+
+    floor = np.zeros((height, width), dtype=bool)
+    region = np.zeros((height, width), dtype=np.uint8)
+    cave_area = np.zeros((height, width), dtype=bool)
+    paths = []
+    rooms = []
+
+    def carve_leaf(x, y, w, h):
+        """Turn a leaf into a room or a cave area, returning its center"""
+        if rng.random() < cave_chance:
+            cave_area[y + 1:y + h - 1, x + 1:x + w - 1] = True
+            center = (x + w // 2, y + h // 2)
+            # Cross through the center keeps the cave reachable from the corridors
+            paths.append((x + 1, center[1], x + w - 2, center[1]))
+            paths.append((center[0], y + 1, center[0], y + h - 2))
+            return center
+
+        room_w = int(rng.integers(max(3, w // 2), w - 1))
+        room_h = int(rng.integers(max(3, h // 2), h - 1))
+        room_x = x + int(rng.integers(1, w - room_w))
+        room_y = y + int(rng.integers(1, h - room_h))
+        floor[room_y:room_y + room_h, room_x:room_x + room_w] = True
+        region[room_y:room_y + room_h, room_x:room_x + room_w] = REGION_ROOM
+        rooms.append((room_x, room_y, room_w, room_h))
+        return (room_x + room_w // 2, room_y + room_h // 2)
+
+    def split(x, y, w, h):
+        """Recursively split the area, connecting sibling subtrees with corridors"""
+        can_split_x = w >= 2 * min_leaf
+        can_split_y = h >= 2 * min_leaf
+        if not can_split_x and not can_split_y:
+            return carve_leaf(x, y, w, h)
+
+        if can_split_x and (not can_split_y or w > h * 1.25 or (h <= w * 1.25 and rng.random() < 0.5)):
+            cut = int(rng.integers(min_leaf, w - min_leaf + 1))
+            a = split(x, y, cut, h)
+            b = split(x + cut, y, w - cut, h)
+        else:
+            cut = int(rng.integers(min_leaf, h - min_leaf + 1))
+            a = split(x, y, w, cut)
+            b = split(x, y + cut, w, h - cut)
+
+        # L-shaped corridor between representative points of both halves
+        if rng.random() < 0.5:
+            paths.append((a[0], a[1], b[0], a[1]))
+            paths.append((b[0], a[1], b[0], b[1]))
+        else:
+            paths.append((a[0], a[1], a[0], b[1]))
+            paths.append((a[0], b[1], b[0], b[1]))
+        return a if rng.random() < 0.5 else b
+
+    split(1, 1, width - 2, height - 2)
+
+    # Caves: random fill smoothed by a few cellular automata steps
+    noise = rng.random((height, width)) < CAVE_FILL
+    floor |= cave_area & noise
+    for _ in range(CAVE_STEPS):
+        neighbours = _neighbour_count(floor)
+        floor = np.where(cave_area, neighbours >= 5, floor)
+    region[cave_area & floor] = REGION_CAVE
+
+    # Corridors and cave crosses are carved last so the automata cannot erode them
+    connected = np.zeros_like(floor)
+    for x0, y0, x1, y1 in paths:
+        connected[min(y0, y1):max(y0, y1) + 1, min(x0, x1):max(x0, x1) + 1] = True
+    for room_x, room_y, room_w, room_h in rooms:
+        connected[room_y:room_y + room_h, room_x:room_x + room_w] = True
+    floor |= connected
+
+    # Keep only cave floor reachable from rooms and corridors
+    floor = _flood(connected, floor, max_steps=4 * min_leaf)
+    floor[0, :] = floor[-1, :] = floor[:, 0] = floor[:, -1] = False
+
+    tiles = _wall_tiles(floor, region)
+
+    # Lava and ice pillars in the inner corners of big rooms
+    for room_x, room_y, room_w, room_h in rooms:
+        if room_w >= 8 and room_h >= 8:
+            pillar = ord('L') if rng.random() < 0.5 else ord('I')
+            for px in (room_x + 2, room_x + room_w - 3):
+                for py in (room_y + 2, room_y + room_h - 3):
+                    tiles[py, px] = pillar
+                    floor[py, px] = False
+
+    _place_entities(rng, tiles, floor, region, rooms, treasure_count, enemy_count)
+
+    data = tiles.tobytes().decode("ascii")
+    return [data[row * width:(row + 1) * width] for row in range(height)]
+
+
+def _neighbour_count(mask):
+    """Count set cells in the 3x3 block around every cell (including itself)"""
+    padded = np.pad(mask, 1).astype(np.uint8)
+    height, width = mask.shape
+    count = np.zeros((height, width), dtype=np.uint8)
+    for dy in range(3):
+        for dx in range(3):
+            count += padded[dy:dy + height, dx:dx + width]
+    return count
+
+
+def _flood(start, passable, max_steps):
+    """Grow start through passable cells with 4-neighbour dilation"""
+    reached = start & passable
+    for _ in range(max_steps):
+        grown = reached.copy()
+        grown[1:, :] |= reached[:-1, :]
+        grown[:-1, :] |= reached[1:, :]
+        grown[:, 1:] |= reached[:, :-1]
+        grown[:, :-1] |= reached[:, 1:]
+        grown &= passable
+        if np.array_equal(grown, reached):
+            break
+        reached = grown
+    return reached
+
+
+def _wall_tiles(floor, region):
+    """Build the tile code array, picking a wall type from the nearby floor"""
+    tiles = np.full(floor.shape, ord('W'), dtype=np.uint8)
+    near_cave = _neighbour_count(floor & (region == REGION_CAVE)) > 0
+    near_room = _neighbour_count(floor & (region == REGION_ROOM)) > 0
+    tiles[near_room] = ord('B')
+    tiles[near_cave] = ord('S')
+    tiles[floor] = ord('.')
+    tiles[0, :] = tiles[-1, :] = tiles[:, 0] = tiles[:, -1] = ord('W')
+    return tiles
+
+
+def _place_entities(rng, tiles, floor, region, rooms, treasure_count, enemy_count):
+    """Place the player, treasures and enemies on free floor tiles"""
+    height, width = floor.shape
+    free = floor.copy()
+
+    if rooms:
+        room_x, room_y, room_w, room_h = rooms[0]
+        player = (room_y + room_h // 2, room_x + room_w // 2)
+    else:
+        cells = np.flatnonzero(free)
+        player = divmod(int(cells[len(cells) // 2]), width) if len(cells) else (height // 2, width // 2)
+    tiles[player] = ord('P')
+    free[player] = False
+
+    if treasure_count is None:
+        treasure_count = max(4, len(rooms) // 3)
+    candidates = np.flatnonzero(free & (region == REGION_ROOM))
+    if len(candidates) < treasure_count:
+        candidates = np.flatnonzero(free)
+    treasures = rng.choice(candidates, min(treasure_count, len(candidates)), replace=False)
+    tiles.flat[treasures] = ord('T')
+    free.flat[treasures] = False
+
+    # Keep enemies away from the player spawn
+    rows, cols = np.indices(floor.shape)
+    far = (np.abs(rows - player[0]) + np.abs(cols - player[1])) > 8
+    candidates = np.flatnonzero(free & far)
+    if enemy_count is None:
+        enemy_count = max(3, int(np.count_nonzero(floor)) // 400)
+    enemies = rng.choice(candidates, min(enemy_count, len(candidates)), replace=False)
+    tiles.flat[enemies] = ord('E')
+
+
+class DungeonPregenerator():
+    def __init__(self, width, height, **options):
+        """
+        Generate the next level in a worker process while the current one is played
+
+        Args:
+            width, height: Size of generated maps in tiles
+            options: Extra keyword arguments for generate_dungeon
+        """
+        self.width = width
+        self.height = height
+        self.options = options
+        self.seed = None
+        self.future = None
+
+        # The pool is created after SDL is up and while other threads run, where
+        # forking can deadlock; spawned workers start from a clean interpreter
+        self.executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+
+    def request(self, seed):
+        """Start generating the level for seed in the background"""
+        self.seed = seed
+        self.future = self.executor.submit(generate_dungeon, self.width, self.height, seed, **self.options)
+
+    def take(self, seed):
+        """
+        Return the pre-generated level for seed, generating it now if it was not requested
+
+        Returns:
+            List of strings, one per row
+        """
+        if self.future is not None and self.seed == seed:
+            future = self.future
+            self.future = None
+            try:
+                return future.result()
+            except Exception as e:
+                print(f"Error pre-generating level: {e}")
+        return generate_dungeon(self.width, self.height, seed, **self.options)
+
+    def close(self):
+        """Shut down the worker"""
+        self.executor.shutdown(wait=True, cancel_futures=True)
@@ -1,62 +1,145 @@
 import pygame as pg
-import random
 import math
+import weakref
+import rng
+
+# Bobbing offsets for one full sine period, sampled every 0.1 radians
+BOB_STEP = 0.1
+BOB_OFFSETS = tuple(int(math.sin(i * BOB_STEP) * 2) for i in range(int(2 * math.pi / BOB_STEP) + 1))
+
+# Enemy decisions draw from their own seeded stream
+_rng = rng.get("enemies")
+
+# Default chase tuning
+CHASE_RANGE = 300  # Distance at which enemies detect the player
+LOST_PLAYER_LIMIT = 120  # Frames spent investigating the last known player position
+
+# Indexes into an enemy frame table
+FRAME_NORMAL = 0
+FRAME_CHASING = 1
+
+# Frame tables shared by every enemy using the same source image
+_frame_tables = weakref.WeakKeyDictionary()
+
+
+def get_enemy_frames(image):
+    """
+    Return the pre-baked visual states for an enemy image
+
+    Args:
+        image: Source pygame Surface
+
+    Returns:
+        Tuple of surfaces indexed by FRAME_NORMAL / FRAME_CHASING
+    """
+    frames = _frame_tables.get(image)
+    if frames is None:
+        normal = image.copy()
+
+        # Red tint overlay used while actively chasing
+        chasing = image.copy()
+        red_overlay = pg.Surface(chasing.get_size())
+        red_overlay.fill((255, 0, 0))
+        red_overlay.set_alpha(50)
+        chasing.blit(red_overlay, (0, 0))
+
+        frames = (normal, chasing)
+        _frame_tables[image] = frames
+    return frames
 
 
 class Enemy(pg.sprite.Sprite):
-    def __init__(self, pos, image, wall_group=None, chase_player=True):
+    def __init__(self, pos, image, wall_group=None, chase_player=True, collision_grid=None, flow_field=None,
+                 field_of_view=None):
         pg.sprite.Sprite.__init__(self)
         self.image = image
         self.rect = self.image.get_rect()
         self.rect.center = pos
+        self.spawn_pos = pos
 
         # Movement properties
         self.speed = 2
-        self.direction = random.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
+        self.direction = _rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
         self.change_timer = 0
         self.change_direction_interval = 60  # Frames before changing direction
 
-        # Wall collision reference
+        # Wall collision reference (the tile grid is preferred when given)
         self.wall_group = wall_group
+        self.collision_grid = collision_grid
+
+        # Shared flow field leading to the player (optional)
+        self.flow_field = flow_field
+
+        # Shared field of view of the player; without it enemies see through walls
+        self.field_of_view = field_of_view
 
         # Chase behavior
+        self.initial_chase_player = chase_player
         self.chase_player = chase_player
-        self.chase_range = 300  # Distance at which enemy detects player
+        self.default_chase_range = CHASE_RANGE
+        self.chase_range = CHASE_RANGE  # Distance at which enemy detects player
+        self.lost_player_limit = LOST_PLAYER_LIMIT
         self.lost_player_timer = 0
         self.last_known_player_pos = None
 
         # AI behavior
-        self.behavior_mode = 'chase' if chase_player else random.choice(['patrol', 'wander', 'guard'])
+        self.behavior_mode = 'chase' if chase_player else _rng.choice(['patrol', 'wander', 'guard'])
         self.patrol_points = []
         self.current_patrol_index = 0
         self.guard_position = pos
         self.guard_radius = 100
 
         # Animation
-        self.animation_timer = 0
-        self.original_image = self.image.copy()
+        self.frames = get_enemy_frames(image)
+        self.original_image = self.frames[FRAME_NORMAL]
+        self.image = self.original_image
+        self.animation_frame = 0
+        self.bob_offset = 0
+
+    def reset(self):
+        """Return the enemy to its spawn state, keeping its stats and image"""
+        self.rect.center = self.spawn_pos
+        self.direction = _rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
+        self.change_timer = 0
+        self.chase_player = self.initial_chase_player
+        self.chase_range = self.default_chase_range
+        self.lost_player_timer = 0
+        self.last_known_player_pos = None
+        if self.chase_player:
+            self.behavior_mode = 'chase'
+        self.current_patrol_index = 0
+        self.image = self.frames[FRAME_NORMAL]
+        self.animation_frame = 0
+        self.bob_offset = 0
 
-    def update(self, player_pos=None):
+    def update(self, player_pos=None, ticks=1):
         """Main update method with optional player position"""
-        self.move(player_pos)
-        self.animate()
+        self.move(player_pos, ticks)
+        self.animate(ticks)
 
-    def move(self, player_pos=None):
-        """Handle enemy movement based on behavior mode"""
-        self.change_timer += 1
+    def move(self, player_pos=None, ticks=1):
+        """
+        Handle enemy movement based on behavior mode
+
+        Args:
+            player_pos: Optional (x, y) of the player
+            ticks: Number of frames to advance; enemies updated less often
+                by the AI scheduler catch up with a single decision
+        """
+        self.change_timer += ticks
 
         # Priority: Chase player if enabled and player is in range
         if self.chase_player and player_pos:
             distance = self.get_distance_to(player_pos)
 
-            if distance < self.chase_range:
+            if distance < self.chase_range and self.can_see_player():
                 # Player detected! Chase them
                 self.chase_behavior(player_pos)
                 self.last_known_player_pos = player_pos
                 self.lost_player_timer = 0
-            elif self.last_known_player_pos and self.lost_player_timer < 120:
+            elif self.last_known_player_pos and self.lost_player_timer < self.lost_player_limit:
                 # Player out of range but recently seen - investigate last position
-                self.lost_player_timer += 1
+                self.lost_player_timer += ticks
                 self.chase_behavior(self.last_known_player_pos)
             else:
                 # Player not detected - use fallback behavior
@@ -65,19 +148,27 @@ class Enemy(pg.sprite.Sprite):
             # No chase mode or no player position - use standard behavior
             self.execute_fallback_behavior()
 
-        # Apply movement
-        old_pos = self.rect.copy()
-        self.rect.x += self.direction[0] * self.speed
-        self.rect.y += self.direction[1] * self.speed
-
-        # Check collision with walls
-        if self.wall_group and pg.sprite.spritecollide(self, self.wall_group, False):
-            self.rect = old_pos
-            # Try to move around obstacle when chasing
-            if self.chase_player and player_pos:
-                self.navigate_around_obstacle(player_pos)
-            else:
-                self.change_direction()
+        # Apply movement one frame at a time so walls are never skipped
+        for _ in range(ticks):
+            old_pos = self.rect.copy()
+            self.rect.x += self.direction[0] * self.speed
+            self.rect.y += self.direction[1] * self.speed
+
+            # Check collision with walls
+            if self.hits_wall():
+                self.rect = old_pos
+                # Try to move around obstacle when chasing
+                if self.chase_player and player_pos:
+                    self.navigate_around_obstacle(player_pos)
+                else:
+                    self.change_direction()
+                break
+
+    def hits_wall(self):
+        """Check wall collision, using the tile grid when available"""
+        if self.collision_grid is not None:
+            return self.collision_grid.collides_rect(self.rect)
+        return bool(self.wall_group and pg.sprite.spritecollide(self, self.wall_group, False))
 
     def execute_fallback_behavior(self):
         """Execute non-chase behavior"""
@@ -93,6 +184,12 @@ class Enemy(pg.sprite.Sprite):
 
     def chase_behavior(self, target_pos):
         """Chase the player smoothly"""
+        # Follow the shared flow field when it leads to the target
+        flow_direction = self.get_flow_direction(target_pos)
+        if flow_direction:
+            self.direction = (flow_direction[0] * self.speed, flow_direction[1] * self.speed)
+            return
+
         dx = target_pos[0] - self.rect.centerx
         dy = target_pos[1] - self.rect.centery
         distance = math.sqrt(dx ** 2 + dy ** 2)
@@ -105,11 +202,23 @@ class Enemy(pg.sprite.Sprite):
             # Set direction for movement
             self.direction = (norm_dx * self.speed, norm_dy * self.speed)
 
+    def get_flow_direction(self, target_pos):
+        """Look up the flow field direction, or None if it does not lead to target_pos"""
+        if self.flow_field is None or not self.flow_field.targets(target_pos):
+            return None
+        return self.flow_field.direction_at(self.rect.centerx, self.rect.centery)
+
     def navigate_around_obstacle(self, target_pos):
         """Try to navigate around walls when chasing"""
+        # Steer by the flow field when available, otherwise towards the target
+        flow_direction = self.get_flow_direction(target_pos)
+        if flow_direction:
+            dx, dy = flow_direction
+        else:
+            dx = target_pos[0] - self.rect.centerx
+            dy = target_pos[1] - self.rect.centery
+
         # Try perpendicular directions
-        dx = target_pos[0] - self.rect.centerx
-        dy = target_pos[1] - self.rect.centery
 
         if abs(dx) > abs(dy):
             # Try moving vertically
@@ -167,26 +276,23 @@ class Enemy(pg.sprite.Sprite):
         else:
             # Small random movements while guarding
             if self.change_timer > self.change_direction_interval:
-                self.direction = random.choice([(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)])
+                self.direction = _rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)])
                 self.change_timer = 0
 
     def change_direction(self):
         """Randomly change direction"""
-        self.direction = random.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
+        self.direction = _rng.choice([(1, 0), (-1, 0), (0, 1), (0, -1)])
 
-    def animate(self):
+    def animate(self, ticks=1):
         """Simple animation - slight bobbing effect and color change when chasing"""
-        self.animation_timer += 0.1
-        offset = int(math.sin(self.animation_timer) * 2)
-
-        # Change color tint when actively chasing
-        if hasattr(self, 'chase_player') and self.chase_player and self.last_known_player_pos:
-            # Create a red tint overlay when chasing
-            self.image = self.original_image.copy()
-            red_overlay = pg.Surface(self.image.get_size())
-            red_overlay.fill((255, 0, 0))
-            red_overlay.set_alpha(50)
-            self.image.blit(red_overlay, (0, 0))
+        self.animation_frame = (self.animation_frame + ticks) % len(BOB_OFFSETS)
+        self.bob_offset = BOB_OFFSETS[self.animation_frame]
+
+        # Use the red tinted frame when actively chasing
+        if self.chase_player and self.last_known_player_pos:
+            self.image = self.frames[FRAME_CHASING]
+        else:
+            self.image = self.frames[FRAME_NORMAL]
 
     def set_patrol_points(self, points):
         """Set custom patrol points"""
@@ -205,19 +311,25 @@ class Enemy(pg.sprite.Sprite):
         if behavior in ['patrol', 'wander', 'guard']:
             self.behavior_mode = behavior
 
-    def set_chase_mode(self, enabled, chase_range=300):
+    def set_chase_mode(self, enabled, chase_range=None):
         """
         Enable or disable chase mode
 
         Args:
             enabled: True to enable chasing, False to disable
-            chase_range: Distance at which enemy detects player
+            chase_range: Distance at which enemy detects player, the
+                enemy's default range when None
         """
         self.chase_player = enabled
-        self.chase_range = chase_range
+        self.chase_range = chase_range if chase_range is not None else self.default_chase_range
         if enabled:
             self.behavior_mode = 'chase'
 
+    def set_chase_range(self, chase_range):
+        """Change the detection range, also used after a reset"""
+        self.default_chase_range = chase_range
+        self.chase_range = chase_range
+
     def set_speed(self, speed):
         """Change enemy speed"""
         self.speed = speed
@@ -227,6 +339,12 @@ class Enemy(pg.sprite.Sprite):
         # Kept for backward compatibility
         self.chase_behavior(target_pos)
 
+    def can_see_player(self):
+        """Check line of sight to the player through the shared field of view"""
+        if self.field_of_view is None:
+            return True
+        return self.field_of_view.is_visible_at(*self.rect.center)
+
     def get_distance_to(self, pos):
         """Calculate distance to a position"""
         dx = pos[0] - self.rect.centerx
@@ -0,0 +1,123 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import pygame as pg
+
+# Overlay alpha of a tile in each fog state
+UNEXPLORED_ALPHA = 255
+EXPLORED_ALPHA = 150
+VISIBLE_ALPHA = 0
+
+
+class FogOfWar():
+    def __init__(self, field_of_view):
+        """
+        Unexplored / explored / visible fog over the tile grid
+
+        Explored and visible tiles are kept as NumPy arrays and mirrored into
+        an overlay with one pixel per tile. When the field of view changes,
+        only the tiles entering or leaving it are patched. Drawing scales the
+        part of the overlay under the view up to tile size, cached until the
+        view or the fog changes, and blits it once.
+
+        Args:
+            field_of_view: FieldOfView of the player, providing the visible tiles
+        """
+        if np is None:
+            raise RuntimeError("FogOfWar requires numpy")
+
+        grid = field_of_view.grid
+        self.field_of_view = field_of_view
+        self.tile_size = grid.tile_size
+        self.cols = grid.cols
+        self.rows = grid.rows
+
+        self.explored = np.zeros((self.rows, self.cols), dtype=bool)
+        self.visible = np.zeros((self.rows, self.cols), dtype=bool)
+        # Flat indexes of the visible tiles, to clear them when the view moves
+        self.lit = np.empty(0, dtype=np.int64)
+        self.origin_tile = None
+        # Bumped on every change, so cached drawings know when to refresh
+        self.version = 0
+
+        self.overlay = pg.Surface((self.cols, self.rows), pg.SRCALPHA)
+        self.view = None
+        self.view_key = None
+        self.reset()
+
+    def reset(self):
+        """Cover the whole map again"""
+        self.explored[:] = False
+        self.visible[:] = False
+        self.lit = np.empty(0, dtype=np.int64)
+        self.origin_tile = None
+        self.overlay.fill((0, 0, 0, UNEXPLORED_ALPHA))
+        self.version += 1
+
+    def update(self):
+        """
+        Take over the field of view if it was recomputed
+
+        Returns:
+            True if the fog changed, False otherwise
+        """
+        field_of_view = self.field_of_view
+        if field_of_view.origin_tile == self.origin_tile:
+            return False
+        self.origin_tile = field_of_view.origin_tile
+
+        lit = np.array(field_of_view.lit, dtype=np.int64)
+        visible = self.visible.reshape(-1)
+        explored = self.explored.reshape(-1)
+        visible[self.lit] = False
+        visible[lit] = True
+        explored[lit] = True
+
+        # Only tiles that were or are now visible can have changed state
+        changed = np.union1d(self.lit, lit)
+        self.lit = lit
+        alpha = pg.surfarray.pixels_alpha(self.overlay)
+        alpha[changed % self.cols, changed // self.cols] = np.where(visible[changed], VISIBLE_ALPHA, EXPLORED_ALPHA)
+        del alpha  # Unlocks the overlay
+
+        self.version += 1
+        return True
+
+    def tile_of(self, x, y):
+        """Convert a pixel position to a tile position, or None if off the map"""
+        col = int(x) // self.tile_size
+        row = int(y) // self.tile_size
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return col, row
+        return None
+
+    def is_explored_at(self, x, y):
+        """Check if the tile under a pixel position has been seen"""
+        tile = self.tile_of(x, y)
+        return tile is not None and bool(self.explored[tile[1], tile[0]])
+
+    def is_visible_at(self, x, y):
+        """Check if the tile under a pixel position is in view"""
+        tile = self.tile_of(x, y)
+        return tile is not None and bool(self.visible[tile[1], tile[0]])
+
+    def draw(self, surface, camera_x=0, camera_y=0):
+        """Blit the fog over the tiles under the view"""
+        tile_size = self.tile_size
+        first_col = max(0, int(camera_x) // tile_size)
+        first_row = max(0, int(camera_y) // tile_size)
+        last_col = min(self.cols - 1, int(camera_x + surface.get_width() - 1) // tile_size)
+        last_row = min(self.rows - 1, int(camera_y + surface.get_height() - 1) // tile_size)
+        if last_col < first_col or last_row < first_row:
+            return
+
+        key = (first_col, first_row, last_col, last_row, self.version)
+        if key != self.view_key:
+            cols = last_col - first_col + 1
+            rows = last_row - first_row + 1
+            area = self.overlay.subsurface((first_col, first_row, cols, rows))
+            self.view = pg.transform.scale(area, (cols * tile_size, rows * tile_size))
+            self.view_key = key
+        surface.blit(self.view, (first_col * tile_size - camera_x, first_row * tile_size - camera_y))
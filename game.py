@@ -0,0 +1,981 @@
+import pygame as pg
+import constants as c
+import math
+import time
+import rng
+from world import World
+from enemy import Enemy
+from tile_layer import StaticTileLayer
+from collision import CollisionGrid, WALL_TILES
+from text_cache import render_text, HudText
+from pathfinding import FlowField
+from visibility import FieldOfView
+from fog import FogOfWar
+from swarm import EnemySwarm
+from ai_scheduler import AIScheduler
+from spatial import SpatialHash
+from background import create_background, create_background_chunk
+from streaming import ChunkedSurface
+from dungeon_gen import DungeonPregenerator
+from controls import KeyboardInput
+from profiler import FrameProfiler
+from wall_atlas import WallAtlas
+from replay import Recording, ReplayInput, ACTION_TOGGLE_CHASE, keys_to_mask, session_settings, state_checksum
+
+# Map settings
+tile_size = 32
+
+# Seeded streams for wall decoration and level setup rolls
+_wall_rng = rng.get("walls")
+_level_rng = rng.get("level")
+
+# Enemy balance parameters, overridable per Game (see balance.py)
+DEFAULT_TUNING = {
+    "speed": 2,
+    "fast_speed": 3,
+    "fast_chance": 0.3,  # Share of enemies spawned with fast_speed
+    "chase_range": 300,
+    "lost_player_limit": 120,
+}
+
+
+# === Classes ===
+class Wall():
+    # Levels hold a wall per tile, so walls are plain records sharing atlas images
+    __slots__ = ("rect", "wall_type", "variant", "atlas")
+
+    def __init__(self, x, y, size, wall_type='W', atlas=None, variant=0):
+        self.rect = pg.Rect(x, y, size, size)
+        self.wall_type = wall_type
+        self.variant = variant
+        self.atlas = atlas
+
+    @property
+    def image(self):
+        return self.atlas.get(self.wall_type, self.variant)
+
+
+class Treasure(pg.sprite.Sprite):
+    def __init__(self, x, y):
+        super().__init__()
+        self.image = pg.Surface((tile_size // 2, tile_size // 2))
+        self.image.fill((255, 215, 0))
+        pg.draw.circle(self.image, (255, 255, 255), (tile_size // 4, tile_size // 4), 3)
+        self.rect = self.image.get_rect()
+        self.rect.center = (x + tile_size // 2, y + tile_size // 2)
+        self.bob_offset = 0
+        self.original_y = self.rect.y
+
+    def update(self):
+        self.bob_offset += 0.2
+        self.rect.y = self.original_y + math.sin(self.bob_offset) * 3
+
+    def reset(self):
+        """Put the treasure back in its starting state"""
+        self.bob_offset = 0
+        self.rect.y = self.original_y
+
+
+class Player(pg.sprite.Sprite):
+    def __init__(self, pos):
+        super().__init__()
+        try:
+            self.image = pg.image.load("ziuty/czarodziej.png").convert_alpha()
+        except:
+            self.image = pg.Surface((tile_size - 4, tile_size - 4))
+            self.image.fill((0, 0, 255))
+            pg.draw.polygon(self.image, (128, 0, 128),
+                            [(tile_size // 2 - 4, 5), (tile_size // 2 - 4, 15), (tile_size // 2 + 4, 10)])
+            pg.draw.circle(self.image, (255, 220, 177), (tile_size // 2 - 4, tile_size // 2), 6)
+            pg.draw.circle(self.image, (0, 0, 0), (tile_size // 2 - 6, tile_size // 2 - 2), 1)
+            pg.draw.circle(self.image, (0, 0, 0), (tile_size // 2 - 2, tile_size // 2 - 2), 1)
+
+        self.rect = self.image.get_rect(center=pos)
+        self.speed = 8
+        self.invulnerable = False
+        self.invuln_timer = 0
+
+        # Player stats
+        self.health = 100
+        self.treasures_collected = 0
+
+    def update(self, keys, wall_group, treasure_group, enemy_group, collision_grid=None,
+               treasure_hash=None, enemy_hash=None):
+        """
+        Move the player, pick up treasures and take damage from enemies
+
+        Args:
+            keys: Pressed keys, indexable by pygame key constants
+            wall_group, treasure_group, enemy_group: Sprite groups of the level
+            collision_grid: Optional CollisionGrid used for wall checks
+            treasure_hash, enemy_hash: Optional SpatialHash indexes of the
+                treasures and enemies; only nearby sprites are tested when given
+        """
+        if self.invulnerable:
+            self.invuln_timer -= 1
+            if self.invuln_timer <= 0:
+                self.invulnerable = False
+
+        old_x = self.rect.x
+        old_y = self.rect.y
+
+        dx, dy = 0, 0
+        if keys[pg.K_w] or keys[pg.K_UP]:
+            dy = -self.speed
+        if keys[pg.K_s] or keys[pg.K_DOWN]:
+            dy = self.speed
+        if keys[pg.K_a] or keys[pg.K_LEFT]:
+            dx = -self.speed
+        if keys[pg.K_d] or keys[pg.K_RIGHT]:
+            dx = self.speed
+
+        if dx != 0 and dy != 0:
+            dx = int(dx * 0.707)
+            dy = int(dy * 0.707)
+
+        self.rect.x += dx
+        if self.hits_wall(wall_group, collision_grid):
+            self.rect.x = old_x
+
+        self.rect.y += dy
+        if self.hits_wall(wall_group, collision_grid):
+            self.rect.y = old_y
+
+        if treasure_hash is not None:
+            collected = treasure_hash.query_rect(self.rect)
+            for treasure in collected:
+                treasure.kill()
+                treasure_hash.remove(treasure)
+        else:
+            collected = pg.sprite.spritecollide(self, treasure_group, True)
+        self.treasures_collected += len(collected)
+
+        if not self.invulnerable:
+            if enemy_hash is not None:
+                enemies_hit = enemy_hash.query_rect(self.rect)
+            else:
+                enemies_hit = pg.sprite.spritecollide(self, enemy_group, False)
+            if enemies_hit:
+                self.health -= 10
+                self.invulnerable = True
+                self.invuln_timer = 60
+
+    def reset(self, pos):
+        """Move the player back to a spawn position with full state reset"""
+        self.rect.center = pos
+        self.invulnerable = False
+        self.invuln_timer = 0
+        self.health = 100
+        self.treasures_collected = 0
+
+    def hits_wall(self, wall_group, collision_grid=None):
+        """Check wall collision, using the tile grid when available"""
+        if collision_grid is not None:
+            return collision_grid.collides_rect(self.rect)
+        return bool(pg.sprite.spritecollide(self, wall_group, False))
+
+
+def create_dungeon_map():
+    map_design = [
+        "WWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWW",
+        "W......................................W",
+        "W..T.........BBBBB.....................W",
+        "W...........B.....B........E...........W",
+        "W..........B.......B...................W",
+        "W.........B....T....B..................W",
+        "W........BBBBB.BBBBB...................W",
+        "W......................................W",
+        "WSSSSSS................LLLLLLLLL.......W",
+        "W.....S................L.......L.......W",
+        "W.....S....E...........L...T...L.......W",
+        "W.....S................L.......L.......W",
+        "W.....S................LLLLLLLLL.......W",
+        "W.....SSSSSSS..........................W",
+        "W......................................W",
+        "W..........................P...........W",
+        "W......................................W",
+        "W......................................W",
+        "W......................................W",
+        "W......................................W",
+        "W......................................W",
+        "W..T................E..................W",
+        "W......................................W",
+        "WWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWWW"
+    ]
+    return map_design
+
+
+def create_enemy_image():
+    """Create enemy sprite image"""
+    img = pg.Surface((tile_size - 4, tile_size - 4))
+    img.fill((255, 0, 255))
+    pg.draw.circle(img, (255, 255, 255), (8, 8), 3)
+    pg.draw.circle(img, (255, 255, 255), (20, 8), 3)
+    pg.draw.circle(img, (0, 0, 0), (8, 8), 2)
+    pg.draw.circle(img, (0, 0, 0), (20, 8), 2)
+    return img
+
+
+def find_safe_spawn_position(wall_group, safe_spawn_positions, preferred_pos=None, collision_grid=None):
+    """Find a safe position where player won't collide with walls"""
+    def collides(test_rect):
+        if collision_grid is not None:
+            return collision_grid.collides_rect(test_rect)
+        for wall in wall_group:
+            if test_rect.colliderect(wall.rect):
+                return True
+        return False
+
+    if preferred_pos:
+        test_rect = pg.Rect(preferred_pos[0] - (tile_size - 4) // 2,
+                            preferred_pos[1] - (tile_size - 4) // 2,
+                            tile_size - 4, tile_size - 4)
+
+        if not collides(test_rect):
+            return preferred_pos
+
+    for pos in safe_spawn_positions:
+        test_rect = pg.Rect(pos[0] - (tile_size - 4) // 2,
+                            pos[1] - (tile_size - 4) // 2,
+                            tile_size - 4, tile_size - 4)
+
+        if not collides(test_rect):
+            return pos
+
+    return preferred_pos or (400, 400)
+
+
+class Game():
+    def __init__(self, screen=None, input_source=None, dt=None, level_source=None, tuning=None, seed=None):
+        """
+        One game session: level state, simulation step and drawing
+
+        Without a screen the game runs headless: nothing is drawn, no display
+        or fonts are needed and run() steps as fast as the CPU allows with a
+        fixed simulated dt instead of waiting on the clock.
+
+        Args:
+            screen: Display surface to draw on, or None for headless mode
+            input_source: Object with get_keys() returning the pressed keys,
+                the real keyboard when None
+            dt: Simulated milliseconds per tick in headless mode
+            level_source: Optional function returning the tile rows of the
+                next level, used instead of the built-in or generated maps
+            tuning: Optional dict overriding entries of DEFAULT_TUNING
+            seed: Optional base seed for every random stream (see rng.py);
+                the same seed and input replay the same session
+        """
+        self.screen = screen
+        self.headless = screen is None
+        self.input = input_source if input_source is not None else KeyboardInput()
+        self.dt = dt if dt is not None else 1000 / c.FPS
+        self.level_source = level_source
+        self.tuning = dict(DEFAULT_TUNING, **(tuning or {}))
+        self.seed = seed
+        if seed is not None:
+            rng.seed(seed)
+        self.clock = pg.time.Clock()
+
+        # HUD labels only re-render when their value changes
+        if not self.headless:
+            self.health_hud = HudText("Health: {}/100", (220, 15))
+            self.treasure_hud = HudText("Treasures: {}", (10, 40))
+            self.time_hud = HudText("Time: {}s", (10, 65))
+
+        self.world = None
+        # Wall records of the level; their images come from the shared atlas
+        self.walls = []
+        self.wall_atlas = WallAtlas(tile_size, _wall_rng)
+        self.treasure_group = pg.sprite.Group()
+        self.enemy_group = pg.sprite.Group()
+        # Indexes of the moving sprites, kept in sync every tick for local queries
+        self.treasure_hash = SpatialHash(c.SPATIAL_CELL_SIZE)
+        self.enemy_hash = SpatialHash(c.SPATIAL_CELL_SIZE)
+        self.ai_scheduler = AIScheduler(budget_ms=c.AI_BUDGET_MS)
+
+        # Procedural levels: the next one is generated in the background while playing
+        self.level_number = 0
+        self.pregenerator = DungeonPregenerator(c.DUNGEON_WIDTH, c.DUNGEON_HEIGHT) if c.PROCEDURAL_LEVELS else None
+
+        self.game_time = 0
+        self.ticks = 0
+        self.camera_x = 0
+        self.camera_y = 0
+        self.running = False
+        self.show_waypoints = False
+        self.fov_tile = None
+        self.chase_mode_enabled = True  # Track if chase mode is globally enabled
+
+        # Fixed-timestep loop: leftover time and how far drawing is between the last two ticks
+        self.render_fps = c.RENDER_FPS
+        self.accumulator = 0
+        self.render_alpha = 1.0
+        self.previous_camera = (0, 0)
+        self.previous_positions = {}
+
+        # Dirty-rect rendering: while the view is still, only changed areas are redrawn
+        self.dirty_rects = c.DIRTY_RECTS
+        self.drawn_rects = []
+        self.view_state = None
+        self.static_frame = None
+        self.static_view = None
+
+        # Per-phase frame timings; F3 shows them, F4 dumps them to CSV
+        self.profiler = FrameProfiler(c.PROFILER_FRAMES)
+        self.profiler.record_requested = c.PROFILER_ENABLED
+        self.profiler.enabled = c.PROFILER_ENABLED
+
+        # Input recording and replay verification
+        self.recorder = None
+        self.frame_actions = 0
+        self.divergent_frame = None
+
+        self.initialize()
+
+    def load_level_map(self):
+        """Return the tile rows for the next level"""
+        self.level_number += 1
+        if self.level_source is not None:
+            return self.level_source()
+        if self.pregenerator is None:
+            return create_dungeon_map()
+
+        seed = c.DUNGEON_SEED + self.level_number - 1
+        world_data = self.pregenerator.take(seed)
+        self.pregenerator.request(seed + 1)
+        return world_data
+
+    def create_map_image(self, map_width, map_height):
+        """Create the background for the map, streamed in chunks for huge maps"""
+        streaming = map_width * map_height > c.STREAMING_MIN_PIXELS
+        # Headless runs never draw, so the background is only built if someone asks for it
+        if streaming or self.headless:
+            return ChunkedSurface(
+                map_width, map_height, c.STREAMING_CHUNK_SIZE,
+                lambda x, y, w, h: create_background_chunk(x, y, w, h, map_height, c.BACKGROUND_SEED),
+                c.STREAMING_MAX_CHUNKS, threaded=not self.headless)
+        return create_background(map_width, map_height, c.BACKGROUND_SEED, c.BACKGROUND_CACHE_DIR)
+
+    def initialize(self):
+        """Build the level and start a new game"""
+        # Stop the previous level's background streaming before building a new one
+        self.close_world()
+
+        # A new level invalidates the cached view
+        self.view_state = None
+        self.static_view = None
+        self.walls = []
+        self.treasure_group.empty()
+        self.enemy_group.empty()
+
+        world_data = self.load_level_map()
+        map_width = len(world_data[0]) * tile_size
+        map_height = len(world_data) * tile_size
+        streaming = map_width * map_height > c.STREAMING_MIN_PIXELS
+        map_image = self.create_map_image(map_width, map_height)
+
+        # Create World instance
+        self.world = World({"tiles": world_data, "tile_size": tile_size}, map_image)
+
+        # Tile occupancy grid used for all wall collision checks
+        self.collision_grid = CollisionGrid.from_map(world_data, tile_size, WALL_TILES)
+
+        # Flow field towards the player, shared by all chasing enemies; it only
+        # has to reach enemies within chase range, plus a margin for detours
+        flow_distance = math.ceil(self.tuning["chase_range"] / tile_size) + c.FLOW_FIELD_MARGIN
+        self.flow_field = FlowField(self.collision_grid, max_distance=flow_distance)
+
+        # Player's field of view, reaching as far as enemies can detect; it
+        # limits enemy detection and drives the fog of war
+        fog = c.FOG_OF_WAR and not self.headless
+        self.field_of_view = None
+        if c.ENEMY_LINE_OF_SIGHT or fog:
+            self.field_of_view = FieldOfView(self.collision_grid, math.ceil(self.tuning["chase_range"] / tile_size) + 1)
+        enemy_view = self.field_of_view if c.ENEMY_LINE_OF_SIGHT else None
+
+        self.fog = None
+        if fog:
+            try:
+                self.fog = FogOfWar(self.field_of_view)
+            except RuntimeError as e:
+                print(f"Fog of war disabled: {e}")
+
+        player_spawn_pos = None
+        safe_spawn_positions = []
+        enemy_image = create_enemy_image()
+        self.level_treasures = []
+        self.level_enemies = []
+
+        for row_index, row in enumerate(world_data):
+            for col_index, tile in enumerate(row):
+                x = col_index * tile_size
+                y = row_index * tile_size
+
+                if tile in WALL_TILES:
+                    variant = self.wall_atlas.variant_at(tile, col_index, row_index)
+                    self.walls.append(Wall(x, y, tile_size, tile, self.wall_atlas, variant))
+                elif tile == 'T':
+                    treasure = Treasure(x, y)
+                    self.level_treasures.append(treasure)
+                    # Add waypoint at treasure location
+                    self.world.add_waypoint(x + tile_size // 2, y + tile_size // 2)
+                elif tile == 'E':
+                    pos = (x + tile_size // 2, y + tile_size // 2)
+                    # Create enemy with chase mode enabled
+                    enemy = Enemy(pos, enemy_image, self.walls, chase_player=True,
+                                  collision_grid=self.collision_grid, flow_field=self.flow_field,
+                                  field_of_view=enemy_view)
+                    enemy.set_speed(self.tuning["speed"])
+                    enemy.set_chase_range(self.tuning["chase_range"])
+                    enemy.lost_player_limit = self.tuning["lost_player_limit"]
+                    # Optional: Randomize some enemy stats
+                    if _level_rng.random() < self.tuning["fast_chance"]:
+                        enemy.set_speed(self.tuning["fast_speed"])
+                    self.level_enemies.append(enemy)
+                elif tile == 'P':
+                    player_spawn_pos = (x + tile_size // 2, y + tile_size // 2)
+                elif tile == '.':
+                    safe_spawn_positions.append((x + tile_size // 2, y + tile_size // 2))
+
+        # Optional batched backend that takes over enemy updates
+        self.enemy_swarm = None
+        if c.USE_ENEMY_SWARM:
+            self.enemy_swarm = EnemySwarm(self.level_enemies, self.collision_grid, self.flow_field,
+                                          field_of_view=enemy_view)
+
+        # Walls never move, so bake them into chunked surfaces once
+        self.wall_layer = None
+        if not self.headless:
+            self.wall_layer = StaticTileLayer(self.walls, tile_size, map_width, map_height,
+                                              max_chunks=c.STREAMING_MAX_CHUNKS if streaming else None)
+
+        self.player_spawn = find_safe_spawn_position(self.walls, safe_spawn_positions,
+                                                     player_spawn_pos, self.collision_grid)
+        self.player = Player(pos=self.player_spawn)
+        self.player_group = pg.sprite.Group(self.player)
+
+        self.reset()
+
+    def reset(self):
+        """
+        Restart the current level
+
+        Only the dynamic state is reset; the background, walls, collision grid
+        and waypoints built by initialize() are reused as they are.
+        """
+        self.game_time = 0
+        self.camera_x = 0
+        self.camera_y = 0
+        # Enemies go back to their spawn chase setting, so the F2 toggle does too
+        self.chase_mode_enabled = True
+
+        self.treasure_group.empty()
+        for treasure in self.level_treasures:
+            treasure.reset()
+            self.treasure_group.add(treasure)
+
+        self.enemy_group.empty()
+        for enemy in self.level_enemies:
+            enemy.reset()
+            self.enemy_group.add(enemy)
+
+        self.treasure_hash.rebuild(self.treasure_group)
+        self.enemy_hash.rebuild(self.enemy_group)
+
+        if self.enemy_swarm:
+            self.enemy_swarm.reset()
+        self.ai_scheduler.reset()
+        self.profiler.clear_enemies()
+        self.flow_field.target_tile = None
+
+        self.player.reset(self.player_spawn)
+        # Nothing to interpolate from after the jump back to the start
+        self.previous_camera = (self.camera_x, self.camera_y)
+        self.previous_positions = {}
+
+        # Uncover the spawn right away rather than on the first tick
+        if self.fog is not None:
+            self.fog.reset()
+            self.field_of_view.update(self.player.rect.center)
+            self.fog.update()
+
+    def is_game_over(self):
+        return self.player.health <= 0
+
+    def is_victory(self):
+        """Check if every treasure was collected; a level without treasures cannot be won"""
+        return bool(self.level_treasures) and self.player.treasures_collected >= len(self.level_treasures)
+
+    def update(self, dt, keys):
+        """
+        Advance the simulation by one tick
+
+        Args:
+            dt: Milliseconds of game time covered by this tick
+            keys: Pressed keys, indexable by pygame key constants
+        """
+        self.ticks += 1
+        self.game_time += dt
+        player = self.player
+
+        # Update game objects
+        self.player_group.update(keys, self.walls, self.treasure_group, self.enemy_group, self.collision_grid,
+                                 self.treasure_hash, self.enemy_hash)
+        self.treasure_group.update()
+        self.treasure_hash.update(self.treasure_group)
+        self.profiler.lap("player")
+
+        # Update enemies with player position for chase behavior
+        self.flow_field.update(player.rect.center)
+        if self.field_of_view is not None:
+            self.field_of_view.update(player.rect.center)
+        if self.fog is not None:
+            self.fog.update()
+        self.update_enemies(player.rect.center)
+        self.profiler.lap("enemies")
+
+        self.update_camera()
+
+        # Restart after game over, next level after victory
+        if self.is_game_over() and keys[pg.K_r]:
+            self.reset()
+        if self.is_victory() and self.pregenerator is not None and keys[pg.K_RETURN]:
+            self.initialize()
+        self.profiler.lap("camera")
+
+    def update_enemies(self, player_pos):
+        """Run the enemy AI through the swarm, the LOD scheduler or a plain loop, as configured"""
+        view_rect = pg.Rect(self.camera_x, self.camera_y, c.SCREEN_WIDTH, c.SCREEN_HEIGHT).inflate(tile_size * 2, tile_size * 2)
+        if self.enemy_swarm:
+            self.enemy_swarm.update(player_pos)
+            self.enemy_swarm.sync(view_rect)
+        elif c.AI_LOD_ENABLED:
+            self.ai_scheduler.update(self.enemy_group, player_pos, view_rect)
+        elif self.ai_scheduler.enemy_timer is not None:
+            for enemy in self.enemy_group:
+                self.profiler.time_enemy(enemy, player_pos)
+        else:
+            for enemy in self.enemy_group:
+                enemy.update(player_pos)
+        self.enemy_hash.update(self.enemy_group)
+
+    def update_camera(self):
+        """Camera follows player smoothly"""
+        target_camera_x = self.player.rect.centerx - c.SCREEN_WIDTH // 2
+        target_camera_y = self.player.rect.centery - c.SCREEN_HEIGHT // 2
+
+        self.camera_x += (target_camera_x - self.camera_x) * 0.1
+        self.camera_y += (target_camera_y - self.camera_y) * 0.1
+
+        map_width = self.world.image.get_width()
+        map_height = self.world.image.get_height()
+        self.camera_x = max(0, min(self.camera_x, map_width - c.SCREEN_WIDTH))
+        self.camera_y = max(0, min(self.camera_y, map_height - c.SCREEN_HEIGHT))
+
+    def camera_offset(self):
+        """Camera position for drawing: interpolated between ticks and snapped to whole pixels"""
+        alpha = self.render_alpha
+        if alpha >= 1:
+            return int(self.camera_x), int(self.camera_y)
+        previous_x, previous_y = self.previous_camera
+        return (int(previous_x + (self.camera_x - previous_x) * alpha),
+                int(previous_y + (self.camera_y - previous_y) * alpha))
+
+    def render_position(self, sprite):
+        """Top-left world position of a sprite, interpolated between the last two ticks"""
+        x, y = sprite.rect.topleft
+        previous = self.previous_positions.get(sprite)
+        alpha = self.render_alpha
+        if previous is None or alpha >= 1:
+            return x, y
+        return (int(previous[0] + (x - previous[0]) * alpha),
+                int(previous[1] + (y - previous[1]) * alpha))
+
+    def draw(self, screen):
+        """
+        Draw the current state of the game
+
+        In dirty-rect mode, frames where the view did not change only restore
+        and redraw the areas of the moving sprites and the HUD; anything that
+        moves the view or covers it (debug overlays, end screens) falls back
+        to a full redraw.
+
+        Returns:
+            List of screen rects that changed, or None if the whole screen did
+        """
+        player = self.player
+        camera_x, camera_y = self.camera_offset()
+        profiler = self.profiler
+
+        fog_version = self.fog.version if self.fog is not None else 0
+        view_state = (camera_x, camera_y, fog_version, self.show_waypoints, profiler.show_overlay,
+                      self.is_game_over(), self.is_victory())
+        partial = self.dirty_rects and view_state == self.view_state and not any(view_state[3:])
+        self.view_state = view_state
+
+        restored = self.drawn_rects
+        if partial:
+            # Put the background and walls back where sprites and HUD were last frame
+            static_frame = self.get_static_frame(screen, (camera_x, camera_y, fog_version))
+            for rect in restored:
+                screen.blit(static_frame, rect, rect)
+            profiler.lap("world")
+            profiler.lap("walls")
+        else:
+            self.draw_background(screen)
+            # Draw waypoints if enabled (toggle with W key)
+            if self.show_waypoints:
+                self.world.draw_waypoints(screen, camera_x, camera_y, (255, 215, 0), 8)
+                self.draw_field_of_view(screen)
+            profiler.lap("world")
+
+            self.draw_walls(screen)
+            self.draw_fog(screen)
+            profiler.lap("walls")
+
+        drawn = self.draw_treasures(screen)
+        drawn += self.draw_enemies(screen)
+
+        # Draw player
+        if not player.invulnerable or (player.invulnerable and player.invuln_timer % 10 < 5):
+            player_x, player_y = self.render_position(player)
+            drawn.append(screen.blit(player.image, (player_x - camera_x, player_y - camera_y)))
+        profiler.lap("sprites")
+
+        # UI Elements
+        health_bar_width = 200
+        health_bar_height = 20
+        health_ratio = max(0, player.health / 100)
+        pg.draw.rect(screen, (255, 0, 0), (10, 10, health_bar_width, health_bar_height))
+        pg.draw.rect(screen, (0, 255, 0), (10, 10, health_bar_width * health_ratio, health_bar_height))
+        drawn.append(pg.draw.rect(screen, (255, 255, 255), (10, 10, health_bar_width, health_bar_height), 2))
+
+        drawn.append(self.health_hud.draw(screen, player.health))
+        drawn.append(self.treasure_hud.draw(screen, player.treasures_collected))
+        drawn.append(self.time_hud.draw(screen, int(self.game_time // 1000)))
+
+        # Game over check
+        if self.is_game_over():
+            game_over_text = render_text("GAME OVER! Press R to restart", (255, 0, 0), size=36)
+            text_rect = game_over_text.get_rect(center=(c.SCREEN_WIDTH // 2, c.SCREEN_HEIGHT // 2))
+            screen.blit(game_over_text, text_rect)
+
+        # Victory check
+        if self.is_victory():
+            victory_text = render_text("VICTORY! All treasures collected!", (0, 255, 0), size=36)
+            text_rect = victory_text.get_rect(center=(c.SCREEN_WIDTH // 2, c.SCREEN_HEIGHT // 2))
+            screen.blit(victory_text, text_rect)
+
+            if self.pregenerator is not None:
+                next_text = render_text("Press ENTER for the next level", (0, 255, 0), size=24)
+                screen.blit(next_text, next_text.get_rect(center=(c.SCREEN_WIDTH // 2, c.SCREEN_HEIGHT // 2 + 30)))
+
+        if profiler.show_overlay:
+            profiler.draw(screen)
+        profiler.lap("hud")
+
+        self.drawn_rects = drawn if self.dirty_rects else []
+        if partial:
+            return restored + drawn
+        return None
+
+    def draw_background(self, surface):
+        """Draw the map background for the current camera position"""
+        # The background covers the view unless the map is smaller than the screen
+        if self.world.width < surface.get_width() or self.world.height < surface.get_height():
+            surface.fill((20, 20, 30))
+        self.world.draw(surface, *self.camera_offset())
+
+    def get_static_frame(self, screen, view_key):
+        """
+        Background, walls and fog of the current view, redrawn only when the view changed
+
+        Args:
+            screen: Screen surface the frame is restored onto
+            view_key: Tuple (camera_x, camera_y, fog_version) the frame is drawn for
+        """
+        if self.static_frame is None or self.static_frame.get_size() != screen.get_size():
+            self.static_frame = pg.Surface(screen.get_size()).convert()
+            self.static_view = None
+        if self.static_view != view_key:
+            self.draw_background(self.static_frame)
+            self.draw_walls(self.static_frame)
+            self.draw_fog(self.static_frame)
+            self.static_view = view_key
+        return self.static_frame
+
+    def draw_walls(self, screen):
+        """Draw the baked wall layer"""
+        self.wall_layer.draw(screen, *self.camera_offset())
+
+    def draw_fog(self, screen):
+        """Draw the fog of war over the background and walls"""
+        if self.fog is not None:
+            self.fog.draw(screen, *self.camera_offset())
+
+    def draw_treasures(self, screen):
+        """
+        Draw the treasures that are still to be collected
+
+        Returns:
+            List of the screen rects drawn
+        """
+        camera_x, camera_y = self.camera_offset()
+        treasures = self.treasure_hash.query_rect(self.view_rect())
+        # Under fog, treasures show up once their tile has been seen
+        if self.fog is not None:
+            treasures = [treasure for treasure in treasures if self.fog.is_explored_at(*treasure.rect.center)]
+        return [screen.blit(treasure.image, (treasure.rect.x - camera_x, treasure.rect.y - camera_y))
+                for treasure in treasures]
+
+    def draw_enemies(self, screen):
+        """
+        Draw the enemies on screen, with their chase range and target in debug mode
+
+        Returns:
+            List of the screen rects of the enemies drawn
+        """
+        player = self.player
+        camera_x, camera_y = self.camera_offset()
+        view_rect = self.view_rect()
+        render_position = self.render_position
+        enemies = self.enemy_hash.query_rect(view_rect)
+        # Under fog, only enemies in view are shown
+        if self.fog is not None:
+            enemies = [enemy for enemy in enemies if self.fog.is_visible_at(*enemy.rect.center)]
+        drawn = []
+        for enemy in enemies:
+            x, y = render_position(enemy)
+            drawn.append(screen.blit(enemy.image, (x - camera_x, y - camera_y + enemy.bob_offset)))
+
+        # Optional: Draw detection radius when in debug mode
+        if self.show_waypoints:  # Reuse F1 debug key
+            chase_range = self.tuning["chase_range"]
+            # Enemies whose circle reaches into the view, and their distances to the player
+            nearby = self.enemy_hash.query_rect(view_rect.inflate(chase_range * 2, chase_range * 2))
+            in_range = dict(self.enemy_hash.query_radius(player.rect.center, chase_range))
+            x, y = render_position(player)
+            player_screen_x = x + player.rect.width // 2 - camera_x
+            player_screen_y = y + player.rect.height // 2 - camera_y
+            for enemy in nearby:
+                # Show chase range
+                x, y = render_position(enemy)
+                screen_x = x + enemy.rect.width // 2 - camera_x
+                screen_y = y + enemy.rect.height // 2 - camera_y
+                pg.draw.circle(screen, (255, 0, 0, 50), (screen_x, screen_y), int(enemy.chase_range), 1)
+
+                # Draw line to player if it is detected: in range and in sight
+                distance = in_range.get(enemy)
+                if (enemy.chase_player and distance is not None and distance < enemy.chase_range
+                        and enemy.can_see_player()):
+                    pg.draw.line(screen, (255, 100, 100), (screen_x, screen_y),
+                                 (player_screen_x, player_screen_y), 2)
+        return drawn
+
+    def draw_field_of_view(self, screen):
+        """Tint the tiles the player can see (debug overlay)"""
+        field_of_view = self.field_of_view
+        if field_of_view is None:
+            return
+        if self.fov_tile is None:
+            self.fov_tile = pg.Surface((tile_size, tile_size), pg.SRCALPHA)
+            self.fov_tile.fill((255, 255, 160, 40))
+
+        camera_x, camera_y = self.camera_offset()
+        cols = field_of_view.grid.cols
+        width, height = screen.get_size()
+        for index in field_of_view.lit:
+            x = (index % cols) * tile_size - camera_x
+            y = (index // cols) * tile_size - camera_y
+            if -tile_size < x < width and -tile_size < y < height:
+                screen.blit(self.fov_tile, (x, y))
+
+    def view_rect(self):
+        """Camera rect in world coordinates, with a tile of margin for bobbing sprites"""
+        return pg.Rect(self.camera_x - tile_size, self.camera_y - tile_size,
+                       c.SCREEN_WIDTH + tile_size * 2, c.SCREEN_HEIGHT + tile_size * 2)
+
+    def handle_event(self, event):
+        """React to a single pygame event"""
+        if event.type == pg.QUIT:
+            self.running = False
+        elif event.type == pg.KEYDOWN:
+            if event.key == pg.K_ESCAPE:
+                self.running = False
+            elif event.key == pg.K_F1:
+                self.show_waypoints = not self.show_waypoints
+            elif event.key == pg.K_F2:
+                # A replay takes its gameplay actions from the recording only
+                if not isinstance(self.input, ReplayInput):
+                    self.toggle_chase_mode()
+            elif event.key == pg.K_F3:
+                # Toggle the profiler overlay; showing it also starts recording
+                self.profiler.show_overlay = not self.profiler.show_overlay
+                self.profiler.enabled = self.profiler.show_overlay or self.profiler.record_requested
+                self.update_enemy_timing()
+            elif event.key == pg.K_F4:
+                self.dump_profile()
+            elif event.key == pg.K_F5:
+                # Toggle per-enemy AI timing
+                self.profiler.enemy_timing = not self.profiler.enemy_timing
+                self.update_enemy_timing()
+                print(f"Per-enemy timing: {'ENABLED' if self.profiler.enemy_timing else 'DISABLED'}")
+
+    def toggle_chase_mode(self):
+        """Toggle chase mode for all enemies"""
+        self.chase_mode_enabled = not self.chase_mode_enabled
+        if self.enemy_swarm:
+            self.enemy_swarm.set_chase_mode(self.chase_mode_enabled)
+        else:
+            for enemy in self.enemy_group:
+                enemy.set_chase_mode(self.chase_mode_enabled)
+            self.ai_scheduler.wake_all()
+        # Events change the simulation too, so they are recorded with the next tick
+        self.frame_actions |= ACTION_TOGGLE_CHASE
+        print(f"Chase mode: {'ENABLED' if self.chase_mode_enabled else 'DISABLED'}")
+
+    def apply_actions(self, actions):
+        """Perform the event actions recorded with a replayed tick"""
+        if actions & ACTION_TOGGLE_CHASE:
+            self.toggle_chase_mode()
+
+    def start_recording(self):
+        """
+        Record the input of every tick from now on
+
+        The AI scheduler's wall-clock budget is lifted, since which enemies
+        it defers would otherwise depend on machine speed.
+
+        Returns:
+            The Recording being filled
+        """
+        self.ai_scheduler.budget_ms = math.inf
+        self.recorder = Recording(session_settings(self))
+        return self.recorder
+
+    def start_replay(self, recording):
+        """Drive the game from a Recording, checking every tick against its checksums"""
+        self.ai_scheduler.budget_ms = math.inf
+        self.input = ReplayInput(recording)
+        self.divergent_frame = None
+
+    def update_enemy_timing(self):
+        """Route enemy updates through the profiler only while per-enemy timing is recorded"""
+        timed = self.profiler.enabled and self.profiler.enemy_timing
+        self.ai_scheduler.enemy_timer = self.profiler if timed else None
+
+    def dump_profile(self, filename=None):
+        """Write the profiler's frame buffer to CSV"""
+        if filename is None:
+            filename = time.strftime("profile_%Y%m%d_%H%M%S.csv")
+        for written in self.profiler.dump_csv(filename):
+            print(f"Profile written to {written}")
+
+    def step(self, max_ticks=None):
+        """
+        Run one frame: as many fixed simulation ticks as the elapsed time
+        calls for and, unless headless, drawing and events
+
+        The simulation always advances in steps of self.dt, so gameplay speed
+        does not depend on the render rate: slow frames run several ticks
+        (skipping the frames in between) and fast frames may run none and
+        draw the sprites interpolated between the last two ticks. Headless
+        games run exactly one tick per step.
+
+        Args:
+            max_ticks: Optional limit on the ticks run by this frame
+
+        Returns:
+            Number of ticks run
+        """
+        profiler = self.profiler
+        profiler.begin_frame()
+        if self.headless:
+            ticks = 1
+        else:
+            elapsed = self.clock.tick(self.render_fps)
+            # After a long stall the lost time is dropped instead of caught up
+            self.accumulator = min(self.accumulator + elapsed, self.dt * c.MAX_TICKS_PER_FRAME)
+            ticks = int(self.accumulator // self.dt)
+        if max_ticks is not None:
+            ticks = min(ticks, max_ticks)
+        profiler.lap("wait")
+
+        # The enemy AI budget covers the whole frame, however many ticks it runs
+        self.ai_scheduler.begin_frame()
+        for _ in range(ticks):
+            self.tick()
+        if not self.headless:
+            self.accumulator -= ticks * self.dt
+            self.render_alpha = min(1.0, self.accumulator / self.dt)
+
+            dirty = self.draw(self.screen)
+            for event in pg.event.get():
+                self.handle_event(event)
+            profiler.lap("events")
+
+            if dirty is None:
+                pg.display.flip()
+            else:
+                pg.display.update(dirty)
+            profiler.lap("flip")
+        profiler.end_frame()
+        return ticks
+
+    def tick(self):
+        """Run one fixed simulation step with its input, recording or verifying it"""
+        keys = self.input.get_keys()
+        # Keys are packed right away, before anything can change them
+        key_mask = keys_to_mask(keys) if self.recorder is not None else 0
+        replay = self.input if isinstance(self.input, ReplayInput) else None
+        dt = self.dt
+
+        # Event actions since the last tick take effect before this one's update
+        actions = self.frame_actions
+        if replay is not None:
+            dt = replay.dt
+            self.apply_actions(replay.actions)
+        self.frame_actions = 0
+        self.profiler.lap("input")
+
+        if not self.headless:
+            self.save_previous_state()
+        self.update(dt, keys)
+
+        if self.recorder is not None:
+            self.recorder.record(dt, key_mask, actions, state_checksum(self))
+        elif replay is not None and self.divergent_frame is None and replay.checksum:
+            if state_checksum(self) != replay.checksum:
+                self.divergent_frame = replay.frame
+                print(f"Replay diverged from the recording at frame {replay.frame}")
+
+    def save_previous_state(self):
+        """Remember the camera and on-screen sprite positions before a tick, for interpolated drawing"""
+        self.previous_camera = (self.camera_x, self.camera_y)
+        positions = {enemy: enemy.rect.topleft for enemy in self.enemy_hash.query_rect(self.view_rect())}
+        positions[self.player] = self.player.rect.topleft
+        self.previous_positions = positions
+
+    def run(self, max_ticks=None):
+        """
+        Run the game loop until it is quit or max_ticks ticks have passed
+
+        Returns:
+            Number of ticks run by this call
+        """
+        start = self.ticks
+        self.running = True
+        while self.running and (max_ticks is None or self.ticks - start < max_ticks):
+            self.step(None if max_ticks is None else max_ticks - (self.ticks - start))
+        return self.ticks - start
+
+    def close(self):
+        """Stop background workers"""
+        if self.pregenerator is not None:
+            self.pregenerator.close()
+        self.close_world()
+
+    def close_world(self):
+        """Stop the prefetch thread of a streamed level background"""
+        if self.world is not None and isinstance(self.world.image, ChunkedSurface):
+            self.world.image.close()
@@ -0,0 +1,324 @@
+import json
+import mmap
+import struct
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b"RLWL"
+VERSION = 2
+
+# magic, version, tile_size, width, height, cols, rows,
+# waypoint count, polyline count, polyline index count, spawn count, enemy spawn count
+HEADER = struct.Struct("<4sHHIIIIIIIII")
+
+
+def _align(offset, size=8):
+    """Round an offset up to the next multiple of size"""
+    return (offset + size - 1) // size * size
+
+
+def _number(value):
+    """Turn whole floats back into ints so JSON output matches the original"""
+    return int(value) if float(value).is_integer() else float(value)
+
+
+class PointView():
+    def __init__(self, values):
+        """
+        Read-only list of (x, y) points over a flat float64 buffer, decoded on access
+
+        Args:
+            values: memoryview cast to 'd' holding x0, y0, x1, y1, ...
+        """
+        self.values = values
+
+    def __len__(self):
+        return len(self.values) // 2
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("point index out of range")
+        return _number(self.values[2 * index]), _number(self.values[2 * index + 1])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def _flatten(points):
+    """Flatten (x, y) points into a float64 array, so coordinates round-trip exactly"""
+    return array('d', [float(v) for point in points for v in point[:2]])
+
+
+class TileRows():
+    def __init__(self, tiles, cols, rows):
+        """
+        Read-only list of tile rows decoded on demand from a tile buffer
+
+        Stands in for the list of strings create_dungeon_map returns, without
+        decoding the whole grid up front.
+
+        Args:
+            tiles: Tile codes as a uint8 buffer (memoryview or NumPy array), row-major
+            cols, rows: Size of the tile grid
+        """
+        self.tiles = tiles
+        self.cols = cols
+        self.rows = rows
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[index] for index in range(*row.indices(self.rows))]
+        if row < 0:
+            row += self.rows
+        if not 0 <= row < self.rows:
+            raise IndexError("tile row out of range")
+        if self.tiles.ndim == 2:
+            return self.tiles[row].tobytes().decode("ascii")
+        return self.tiles[row * self.cols:(row + 1) * self.cols].tobytes().decode("ascii")
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield self[row]
+
+
+class LevelData():
+    def __init__(self, tiles, cols, rows, tile_size, width, height,
+                 waypoints, polylines, spawn_points, enemy_spawns, buffer=None):
+        """
+        Level contents loaded from the binary format
+
+        Args:
+            tiles: Tile codes as a uint8 buffer (memoryview or NumPy array), row-major
+            cols, rows: Size of the tile grid
+            tile_size: Size of a single tile in pixels
+            width, height: Size of the map in pixels
+            waypoints, spawn_points, enemy_spawns: Sequences of (x, y), PointView
+                when backed by the memory map
+            polylines: List of waypoint index lists
+            buffer: Memory map backing the tile buffer and points, kept open while in use
+        """
+        self.tiles = tiles
+        self.cols = cols
+        self.rows = rows
+        self.tile_size = tile_size
+        self.width = width
+        self.height = height
+        self.waypoints = waypoints
+        self.waypoint_polylines = polylines
+        self.spawn_points = spawn_points
+        self.enemy_spawns = enemy_spawns
+        self.buffer = buffer
+
+    def tile_rows(self):
+        """Return the tile grid as rows of strings, the format create_dungeon_map uses, decoded on demand"""
+        return TileRows(self.tiles, self.cols, self.rows)
+
+    def tile_at(self, col, row):
+        """Return the tile character at a grid position, read straight from the buffer"""
+        if self.tiles.ndim == 2:
+            return chr(self.tiles[row, col])
+        return chr(self.tiles[row * self.cols + col])
+
+    def to_dict(self):
+        """
+        Return the level in the World JSON layout
+
+        Tiles stay backed by the buffer. Points are copied into lists, since
+        World edits them (add_waypoint) and they are small next to the tiles.
+        """
+        return {
+            "tiles": self.tile_rows(),
+            "tile_size": self.tile_size,
+            "waypoints": list(self.waypoints),
+            "waypoint_polylines": self.waypoint_polylines,
+            "spawn_points": list(self.spawn_points),
+            "enemy_spawns": list(self.enemy_spawns),
+            "width": self.width,
+            "height": self.height
+        }
+
+    def close(self):
+        """
+        Release the memory map
+
+        Raises:
+            BufferError: If tile rows or point views taken from this level
+                are still referenced elsewhere
+        """
+        if self.buffer is not None:
+            self.tiles = None
+            self.waypoints = None
+            self.spawn_points = None
+            self.enemy_spawns = None
+            self.buffer.close()
+            self.buffer = None
+
+
+def save_level(filename, tiles, tile_size=32, waypoints=(), polylines=(), spawn_points=(),
+               enemy_spawns=(), width=None, height=None):
+    """
+    Write a level in the binary format
+
+    Args:
+        filename: Path to save file
+        tiles: List of strings, one per row of tile characters
+        tile_size: Size of a single tile in pixels
+        waypoints, spawn_points, enemy_spawns: Lists of (x, y)
+        polylines: List of waypoint index lists
+        width, height: Map size in pixels, derived from the tiles when not given
+    """
+    rows = len(tiles)
+    cols = len(tiles[0]) if rows else 0
+    width = cols * tile_size if width is None else width
+    height = rows * tile_size if height is None else height
+
+    tile_bytes = "".join(tiles).encode("ascii")
+    if len(tile_bytes) != cols * rows:
+        raise ValueError("All tile rows must have the same length")
+
+    polyline_lengths = array('I', [len(polyline) for polyline in polylines])
+    polyline_indexes = array('I', [index for polyline in polylines for index in polyline])
+
+    header = HEADER.pack(MAGIC, VERSION, tile_size, int(width), int(height), cols, rows,
+                         len(waypoints), len(polyline_lengths), len(polyline_indexes),
+                         len(spawn_points), len(enemy_spawns))
+
+    sections = [tile_bytes, _flatten(waypoints).tobytes(), polyline_lengths.tobytes(),
+                polyline_indexes.tobytes(), _flatten(spawn_points).tobytes(),
+                _flatten(enemy_spawns).tobytes()]
+
+    with open(filename, 'wb') as f:
+        f.write(header)
+        offset = HEADER.size
+        for section in sections:
+            f.write(section)
+            offset += len(section)
+            padding = _align(offset) - offset
+            f.write(b"\0" * padding)
+            offset += padding
+
+
+def load_level(filename):
+    """
+    Load a binary level through a memory map
+
+    The tile grid is exposed directly from the mapped file without copying.
+
+    Args:
+        filename: Path to load file
+
+    Returns:
+        LevelData instance
+    """
+    with open(filename, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        (magic, version, tile_size, width, height, cols, rows, waypoint_count, polyline_count,
+         polyline_index_count, spawn_count, enemy_spawn_count) = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a binary level file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported level format version {version}")
+
+        view = memoryview(buffer)
+        offset = HEADER.size
+
+        def take(size):
+            nonlocal offset
+            start = offset
+            offset = _align(offset + size)
+            return view[start:start + size]
+
+        tile_count = cols * rows
+        if np is not None:
+            tiles = np.frombuffer(buffer, dtype=np.uint8, count=tile_count, offset=offset).reshape(rows, cols)
+            take(tile_count)
+        else:
+            tiles = take(tile_count)
+
+        waypoints = PointView(take(waypoint_count * 16).cast('d'))
+        polyline_lengths = take(polyline_count * 4).cast('I')
+        polyline_indexes = take(polyline_index_count * 4).cast('I')
+        spawn_points = PointView(take(spawn_count * 16).cast('d'))
+        enemy_spawns = PointView(take(enemy_spawn_count * 16).cast('d'))
+    except (ValueError, struct.error):
+        try:
+            buffer.close()
+        except BufferError:
+            pass
+        raise
+
+    polylines = []
+    start = 0
+    for length in polyline_lengths:
+        polylines.append(list(polyline_indexes[start:start + length]))
+        start += length
+
+    return LevelData(tiles, cols, rows, tile_size, width, height,
+                     waypoints, polylines, spawn_points, enemy_spawns, buffer)
+
+
+def verify_level(filename, waypoints=(), spawn_points=(), enemy_spawns=()):
+    """
+    Check that a saved level gives back the points it was written from
+
+    Args:
+        filename: Path of the binary level
+        waypoints, spawn_points, enemy_spawns: Source lists of (x, y)
+
+    Raises:
+        ValueError: If any loaded point differs from its source value
+    """
+    level = load_level(filename)
+    try:
+        loaded = {"waypoints": list(level.waypoints), "spawn_points": list(level.spawn_points),
+                  "enemy_spawns": list(level.enemy_spawns)}
+    finally:
+        level.close()
+
+    sources = {"waypoints": waypoints, "spawn_points": spawn_points, "enemy_spawns": enemy_spawns}
+    for name, points in sources.items():
+        expected = [(float(p[0]), float(p[1])) for p in points]
+        actual = [(float(p[0]), float(p[1])) for p in loaded[name]]
+        if expected != actual:
+            raise ValueError(f"{filename}: {name} did not survive the round trip")
+
+
+def json_to_binary(json_filename, binary_filename):
+    """Convert a World JSON save into the binary format and verify the result"""
+    with open(json_filename, 'r') as f:
+        data = json.load(f)
+
+    waypoints = [tuple(p) for p in data.get("waypoints", [])]
+    spawn_points = [tuple(p) for p in data.get("spawn_points", [])]
+    enemy_spawns = [tuple(p) for p in data.get("enemy_spawns", [])]
+    save_level(binary_filename, data.get("tiles", []), data.get("tile_size", 32),
+               waypoints, data.get("waypoint_polylines", []), spawn_points, enemy_spawns,
+               data.get("width"), data.get("height"))
+    verify_level(binary_filename, waypoints, spawn_points, enemy_spawns)
+
+
+def binary_to_json(binary_filename, json_filename):
+    """Convert a binary level back into the World JSON format"""
+    level = load_level(binary_filename)
+    try:
+        data = level.to_dict()
+        data["tiles"] = list(data["tiles"])
+    finally:
+        level.close()
+
+    with open(json_filename, 'w') as f:
+        json.dump(data, f, indent=4)
@@ -0,0 +1,148 @@
+from array import array
+from collections import deque
+
+# Neighbour offsets; index + 1 is stored in the direction cache (0 = no move)
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+DIAGONAL = 0.7071
+UNIT_VECTORS = tuple((dx * DIAGONAL, dy * DIAGONAL) if dx and dy else (dx, dy) for dx, dy in NEIGHBOURS)
+
+NOT_COMPUTED = 255
+UNREACHED = -1
+
+
+class FlowField():
+    def __init__(self, collision_grid, max_distance=None):
+        """
+        Breadth-first flow field towards a single target tile
+
+        The field is rebuilt only when the target moves to another tile and
+        is shared by every enemy, so each lookup is O(1).
+
+        Args:
+            collision_grid: CollisionGrid describing solid tiles
+            max_distance: Optional limit (in tiles) on how far the search spreads
+        """
+        self.grid = collision_grid
+        self.max_distance = max_distance
+        self.target_tile = None
+
+        size = collision_grid.cols * collision_grid.rows
+        self._unreached = array('i', [UNREACHED]) * size
+        self._not_computed = bytes([NOT_COMPUTED]) * size
+        self.distance = array('i', self._unreached)
+        self.directions = bytearray(self._not_computed)
+
+    def tile_of(self, x, y):
+        """Convert a pixel position to a tile position"""
+        return int(x) // self.grid.tile_size, int(y) // self.grid.tile_size
+
+    def update(self, target_pos):
+        """
+        Rebuild the field if the target has moved to a different tile
+
+        Returns:
+            True if the field was rebuilt, False otherwise
+        """
+        target_tile = self.tile_of(*target_pos)
+        if target_tile == self.target_tile:
+            return False
+        self.compute(*target_tile)
+        return True
+
+    def compute(self, target_col, target_row):
+        """Run a BFS from the target tile over all free tiles"""
+        grid = self.grid
+        cols = grid.cols
+        rows = grid.rows
+        solid = grid.solid
+        distance = self.distance
+
+        distance[:] = self._unreached
+        self.directions[:] = self._not_computed
+        self.target_tile = (target_col, target_row)
+
+        if grid.is_solid(target_col, target_row):
+            return
+
+        max_distance = self.max_distance
+        start = target_row * cols + target_col
+        distance[start] = 0
+        queue = deque([start])
+
+        while queue:
+            index = queue.popleft()
+            next_distance = distance[index] + 1
+            if max_distance is not None and next_distance > max_distance:
+                continue
+
+            col = index % cols
+            if col > 0:
+                neighbour = index - 1
+                if distance[neighbour] == UNREACHED and not solid[neighbour]:
+                    distance[neighbour] = next_distance
+                    queue.append(neighbour)
+            if col < cols - 1:
+                neighbour = index + 1
+                if distance[neighbour] == UNREACHED and not solid[neighbour]:
+                    distance[neighbour] = next_distance
+                    queue.append(neighbour)
+            if index >= cols:
+                neighbour = index - cols
+                if distance[neighbour] == UNREACHED and not solid[neighbour]:
+                    distance[neighbour] = next_distance
+                    queue.append(neighbour)
+            if index < (rows - 1) * cols:
+                neighbour = index + cols
+                if distance[neighbour] == UNREACHED and not solid[neighbour]:
+                    distance[neighbour] = next_distance
+                    queue.append(neighbour)
+
+    def targets(self, pos):
+        """Check if the field currently leads to the tile under pos"""
+        return self.tile_of(*pos) == self.target_tile
+
+    def direction_at(self, x, y):
+        """
+        Get the direction to move from a pixel position
+
+        Args:
+            x, y: Position in world coordinates
+
+        Returns:
+            Unit vector (dx, dy), or None if the position is the target tile
+            or has no path to it
+        """
+        col, row = self.tile_of(x, y)
+        grid = self.grid
+        if not (0 <= col < grid.cols and 0 <= row < grid.rows):
+            return None
+
+        index = row * grid.cols + col
+        cached = self.directions[index]
+        if cached == NOT_COMPUTED:
+            cached = self._best_neighbour(col, row)
+            self.directions[index] = cached
+        return UNIT_VECTORS[cached - 1] if cached else None
+
+    def _best_neighbour(self, col, row):
+        """Pick the neighbour with the lowest distance, without cutting corners"""
+        grid = self.grid
+        current = self.distance[row * grid.cols + col]
+        if current <= 0:
+            return 0
+
+        best = 0
+        best_distance = current
+        for i, (dx, dy) in enumerate(NEIGHBOURS):
+            next_col = col + dx
+            next_row = row + dy
+            if grid.is_solid(next_col, next_row):
+                continue
+            if dx and dy and (grid.is_solid(col + dx, row) or grid.is_solid(col, row + dy)):
+                continue
+
+            neighbour_distance = self.distance[next_row * grid.cols + next_col]
+            if neighbour_distance != UNREACHED and neighbour_distance < best_distance:
+                best = i + 1
+                best_distance = neighbour_distance
+        return best
@@ -0,0 +1,215 @@
+import csv
+import time
+from array import array
+
+import pygame as pg
+from text_cache import get_font
+
+# Phases of a frame, in the order they run
+PHASES = ("wait", "input", "player", "enemies", "camera", "world", "walls", "sprites", "hud", "events", "flip")
+
+TARGET_FRAME_MS = 1000 / 60
+
+
+class FrameProfiler():
+    def __init__(self, capacity=600, phases=PHASES, refresh_interval=15):
+        """
+        Per-phase frame timings kept in a fixed-size ring buffer
+
+        The game loop calls begin_frame(), lap(phase) after each phase and
+        end_frame(). Each lap stores the time since the previous one. While
+        disabled every call returns right away, so the instrumentation can
+        stay in the loop.
+
+        Args:
+            capacity: Number of frames kept before the oldest are overwritten
+            phases: Names of the phases that are timed
+            refresh_interval: Frames between rebuilds of the overlay
+        """
+        self.capacity = capacity
+        self.phases = phases
+        self.samples = {phase: array('d', bytes(8 * capacity)) for phase in phases}
+        self.totals = array('d', bytes(8 * capacity))
+        self.index = 0
+        self.count = 0
+        self.frame_number = 0
+
+        # enabled takes effect at the next begin_frame so a frame is never half recorded
+        self.enabled = False
+        # Recording asked for from outside the overlay (config or command line);
+        # hiding the overlay keeps recording while this is set
+        self.record_requested = False
+        self.active = False
+        self.frame_start = 0.0
+        self.last = 0.0
+
+        # Opt-in per-enemy AI timing: enemy -> [calls, total seconds, max seconds]
+        self.enemy_timing = False
+        self.enemy_stats = {}
+
+        self.show_overlay = False
+        self.refresh_interval = refresh_interval
+        self.overlay = None
+        self.overlay_age = 0
+
+    def begin_frame(self):
+        """Start recording a new frame"""
+        self.active = self.enabled
+        if not self.active:
+            return
+        now = time.perf_counter()
+        self.frame_start = now
+        self.last = now
+        index = self.index
+        for samples in self.samples.values():
+            samples[index] = 0.0
+
+    def lap(self, phase):
+        """Charge the time since the previous lap to phase"""
+        if not self.active:
+            return
+        now = time.perf_counter()
+        self.samples[phase][self.index] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        """Finish the frame and move on to the next slot of the ring buffer"""
+        if not self.active:
+            return
+        self.totals[self.index] = time.perf_counter() - self.frame_start
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.frame_number += 1
+
+    def time_enemy(self, enemy, player_pos=None, ticks=1):
+        """Update an enemy and record how long its AI took"""
+        start = time.perf_counter()
+        enemy.update(player_pos, ticks)
+        elapsed = time.perf_counter() - start
+
+        stats = self.enemy_stats.get(enemy)
+        if stats is None:
+            self.enemy_stats[enemy] = [1, elapsed, elapsed]
+        else:
+            stats[0] += 1
+            stats[1] += elapsed
+            if elapsed > stats[2]:
+                stats[2] = elapsed
+
+    def clear_enemies(self):
+        """Forget per-enemy timings, e.g. when the level changes"""
+        self.enemy_stats.clear()
+
+    def clear(self):
+        """Drop all recorded frames"""
+        self.index = 0
+        self.count = 0
+        self.overlay = None
+        self.clear_enemies()
+
+    def recent(self, samples):
+        """Return the recorded values of a ring buffer, oldest first"""
+        start = (self.index - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            return samples[start:start + self.count]
+        return samples[start:] + samples[:self.index]
+
+    def stats(self, samples):
+        """
+        Summarize a ring buffer
+
+        Returns:
+            Tuple (average, p95, p99) in milliseconds
+        """
+        values = sorted(self.recent(samples))
+        if not values:
+            return 0.0, 0.0, 0.0
+        last = len(values) - 1
+        average = sum(values) / len(values)
+        return average * 1000, values[int(last * 0.95)] * 1000, values[int(last * 0.99)] * 1000
+
+    def slowest_enemies(self, count=5):
+        """Return the enemies with the highest average AI time as (enemy, calls, avg, max)"""
+        ranked = sorted(self.enemy_stats.items(), key=lambda item: item[1][1] / item[1][0], reverse=True)
+        return [(enemy, calls, total / calls, worst) for enemy, (calls, total, worst) in ranked[:count]]
+
+    def dump_csv(self, filename):
+        """
+        Write the buffered frames to a CSV file, one row per frame
+
+        Per-enemy timings, when recorded, go to a second file with an
+        "_enemies" suffix.
+
+        Returns:
+            List of written file names
+        """
+        written = []
+        try:
+            with open(filename, "w", newline="") as file:
+                writer = csv.writer(file)
+                writer.writerow(["frame", "total_ms"] + [f"{phase}_ms" for phase in self.phases])
+                columns = [self.recent(self.totals)] + [self.recent(self.samples[phase]) for phase in self.phases]
+                first_frame = self.frame_number - self.count
+                for row, values in enumerate(zip(*columns)):
+                    writer.writerow([first_frame + row] + [f"{value * 1000:.4f}" for value in values])
+            written.append(filename)
+
+            if self.enemy_stats:
+                base, dot, extension = filename.rpartition(".")
+                enemy_filename = f"{base}_enemies.{extension}" if dot else f"{filename}_enemies"
+                with open(enemy_filename, "w", newline="") as file:
+                    writer = csv.writer(file)
+                    writer.writerow(["spawn_x", "spawn_y", "behavior", "calls", "avg_us", "max_us", "total_ms"])
+                    for enemy, calls, average, worst in self.slowest_enemies(len(self.enemy_stats)):
+                        writer.writerow([enemy.spawn_pos[0], enemy.spawn_pos[1], enemy.behavior_mode, calls,
+                                         f"{average * 1e6:.2f}", f"{worst * 1e6:.2f}",
+                                         f"{average * calls * 1000:.3f}"])
+                written.append(enemy_filename)
+        except OSError as e:
+            print(f"Error writing profile: {e}")
+        return written
+
+    def build_overlay(self, graph_frames=240, graph_height=60, graph_scale_ms=2 * TARGET_FRAME_MS):
+        """Render the phase table and the frame-time graph into one surface"""
+        font = get_font(None, 18)
+        lines = []
+        for phase in self.phases:
+            average, p95, p99 = self.stats(self.samples[phase])
+            lines.append(f"{phase:<8} {average:6.2f} {p95:6.2f} {p99:6.2f}")
+        average, p95, p99 = self.stats(self.totals)
+        lines.append(f"{'frame':<8} {average:6.2f} {p95:6.2f} {p99:6.2f}")
+        if self.enemy_timing:
+            for enemy, calls, enemy_average, worst in self.slowest_enemies(3):
+                lines.append(f"{enemy.behavior_mode} @{enemy.spawn_pos}: {enemy_average * 1e6:.0f}/{worst * 1e6:.0f} us")
+
+        line_height = font.get_linesize()
+        width = max(graph_frames, 220) + 10
+        height = line_height * (len(lines) + 1) + graph_height + 15
+        overlay = pg.Surface((width, height), pg.SRCALPHA)
+        overlay.fill((0, 0, 0, 170))
+
+        overlay.blit(font.render("phase      avg    p95    p99 ms", True, (200, 200, 200)), (5, 5))
+        for i, line in enumerate(lines):
+            overlay.blit(font.render(line, True, (255, 255, 255)), (5, 5 + line_height * (i + 1)))
+
+        # Frame-time graph: one column per frame, red when over the frame budget
+        graph_top = height - graph_height - 5
+        frames = self.recent(self.totals)[-graph_frames:]
+        for x, total in enumerate(frames):
+            total_ms = total * 1000
+            bar = min(graph_height, int(total_ms / graph_scale_ms * graph_height))
+            color = (255, 80, 80) if total_ms > TARGET_FRAME_MS * 1.1 else (80, 220, 80)
+            pg.draw.line(overlay, color, (5 + x, graph_top + graph_height), (5 + x, graph_top + graph_height - bar))
+        target_y = graph_top + graph_height - int(TARGET_FRAME_MS / graph_scale_ms * graph_height)
+        pg.draw.line(overlay, (255, 255, 0), (5, target_y), (5 + graph_frames, target_y))
+        return overlay
+
+    def draw(self, surface, pos=None):
+        """Draw the overlay, rebuilding it every refresh_interval frames"""
+        if self.overlay is None or self.overlay_age >= self.refresh_interval:
+            self.overlay = self.build_overlay()
+            self.overlay_age = 0
+        self.overlay_age += 1
+        if pos is None:
+            pos = (surface.get_width() - self.overlay.get_width() - 10, 10)
+        surface.blit(self.overlay, pos)
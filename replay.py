@@ -0,0 +1,181 @@
+import json
+import struct
+import zlib
+from array import array
+
+import constants as c
+from controls import GAME_KEYS, KeyState
+
+MAGIC = b"RLWR"
+VERSION = 3
+
+# magic, version, JSON header length
+HEADER = struct.Struct("<4sHI")
+
+# Per-tick actions that come from events rather than held keys
+ACTION_TOGGLE_CHASE = 1
+
+
+def keys_to_mask(keys):
+    """Pack the state of GAME_KEYS into a bitmask"""
+    mask = 0
+    for bit, key in enumerate(GAME_KEYS):
+        if keys[key]:
+            mask |= 1 << bit
+    return mask
+
+
+def mask_to_keys(mask):
+    """Unpack a bitmask made by keys_to_mask into a KeyState"""
+    return KeyState(key for bit, key in enumerate(GAME_KEYS) if mask & (1 << bit))
+
+
+def state_checksum(game):
+    """CRC of the simulation state (player, treasures, enemies) used to detect divergence"""
+    player = game.player
+    values = array('i', [player.rect.x, player.rect.y, player.health, player.treasures_collected,
+                         len(game.treasure_group), game.level_number])
+    for enemy in game.enemy_group:
+        values.append(enemy.rect.x)
+        values.append(enemy.rect.y)
+    return zlib.crc32(values.tobytes())
+
+
+class Recording():
+    def __init__(self, header=None):
+        """
+        Per-tick input of a session, compact enough to keep hours of play
+
+        Each simulation tick stores the dt, a bitmask of the game keys, a
+        bitmask of the event actions taken before the tick and a checksum of
+        the resulting state. The header holds
+        the seed and the settings needed to rebuild the same session.
+
+        Args:
+            header: Dict with the seed and game settings
+        """
+        self.header = header or {}
+        # Frame times are kept as doubles, exactly as the live run used them
+        self.dts = array('d')
+        self.keys = array('H')
+        self.actions = array('B')
+        self.checksums = array('I')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def record(self, dt, key_mask, actions=0, checksum=0):
+        """Append one tick; key_mask comes from keys_to_mask()"""
+        self.dts.append(dt)
+        self.keys.append(key_mask)
+        self.actions.append(actions)
+        self.checksums.append(checksum)
+
+    def save(self, filename):
+        """Write the recording: header, then the zlib-compressed frame arrays"""
+        header = json.dumps(dict(self.header, frames=len(self))).encode("utf-8")
+        payload = zlib.compress(self.dts.tobytes() + self.keys.tobytes()
+                                + self.actions.tobytes() + self.checksums.tobytes(), 9)
+        try:
+            with open(filename, "wb") as file:
+                file.write(HEADER.pack(MAGIC, VERSION, len(header)))
+                file.write(header)
+                file.write(payload)
+        except OSError as e:
+            print(f"Error saving recording: {e}")
+
+    @staticmethod
+    def load(filename):
+        """
+        Read a recording saved with save()
+
+        Returns:
+            Recording, or None if the file cannot be read
+        """
+        try:
+            with open(filename, "rb") as file:
+                data = file.read()
+            magic, version, header_size = HEADER.unpack_from(data)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"not a version {VERSION} recording")
+            header = json.loads(data[HEADER.size:HEADER.size + header_size])
+            payload = zlib.decompress(data[HEADER.size + header_size:])
+        except (OSError, ValueError, struct.error, zlib.error) as e:
+            print(f"Error loading recording: {e}")
+            return None
+
+        recording = Recording(header)
+        frames = header["frames"]
+        offset = 0
+        for values in (recording.dts, recording.keys, recording.actions, recording.checksums):
+            size = frames * values.itemsize
+            values.frombytes(payload[offset:offset + size])
+            offset += size
+        return recording
+
+
+class ReplayInput():
+    def __init__(self, recording):
+        """
+        Input source playing back a Recording tick by tick
+
+        Besides the keys it exposes the recorded dt, actions and checksum of
+        the current tick, which Game.tick applies and verifies.
+
+        Args:
+            recording: Recording to play back
+        """
+        self.recording = recording
+        self.frame = -1
+        self.dt = 0
+        self.actions = 0
+        self.checksum = 0
+        self.key_states = {}
+
+    def finished(self):
+        return self.frame + 1 >= len(self.recording)
+
+    def get_keys(self):
+        if self.finished():
+            self.actions = 0
+            return KeyState()
+        self.frame += 1
+        recording = self.recording
+        self.dt = recording.dts[self.frame]
+        self.actions = recording.actions[self.frame]
+        self.checksum = recording.checksums[self.frame]
+
+        mask = recording.keys[self.frame]
+        keys = self.key_states.get(mask)
+        if keys is None:
+            keys = mask_to_keys(mask)
+            self.key_states[mask] = keys
+        return keys
+
+
+def session_settings(game):
+    """Settings that must match for a recording to replay the same session"""
+    return {
+        "seed": game.seed,
+        "procedural_levels": c.PROCEDURAL_LEVELS,
+        "dungeon": [c.DUNGEON_WIDTH, c.DUNGEON_HEIGHT, c.DUNGEON_SEED],
+        "enemy_swarm": c.USE_ENEMY_SWARM,
+        "ai_lod": c.AI_LOD_ENABLED,
+        "line_of_sight": c.ENEMY_LINE_OF_SIGHT,
+        "tuning": game.tuning,
+    }
+
+
+def apply_settings(settings):
+    """
+    Restore the constants saved by session_settings()
+
+    Returns:
+        Tuple (seed, tuning) to create the Game with
+    """
+    c.PROCEDURAL_LEVELS = settings["procedural_levels"]
+    c.DUNGEON_WIDTH, c.DUNGEON_HEIGHT, c.DUNGEON_SEED = settings["dungeon"]
+    c.USE_ENEMY_SWARM = settings["enemy_swarm"]
+    c.AI_LOD_ENABLED = settings["ai_lod"]
+    c.ENEMY_LINE_OF_SIGHT = settings["line_of_sight"]
+    return settings["seed"], settings["tuning"]
@@ -0,0 +1,54 @@
+import random
+import zlib
+
+# Every subsystem draws from its own stream, so extra rolls in one (e.g. a
+# different number of wall tiles) never shift the numbers seen by another
+_streams = {}
+_seed = None
+
+
+def derive_seed(name, seed=None):
+    """
+    Derive a stable integer seed for a named stream
+
+    Args:
+        name: Stream name, e.g. "enemies"
+        seed: Base seed; the one given to seed() when None
+
+    Returns:
+        Integer seed, or None if no base seed is set (fresh entropy)
+    """
+    if seed is None:
+        seed = _seed
+    if seed is None:
+        return None
+    return zlib.crc32(f"{seed}:{name}".encode())
+
+
+def get(name):
+    """Return the random.Random stream for a subsystem, creating it on first use"""
+    stream = _streams.get(name)
+    if stream is None:
+        stream = random.Random(derive_seed(name))
+        _streams[name] = stream
+    return stream
+
+
+def seed(value=None):
+    """
+    Reseed every stream from one base seed
+
+    Streams are reseeded in place, so modules may keep a reference to them.
+
+    Args:
+        value: Base seed, or None for fresh entropy
+    """
+    global _seed
+    _seed = value
+    for name, stream in _streams.items():
+        stream.seed(derive_seed(name))
+
+
+def get_seed():
+    """Return the current base seed"""
+    return _seed
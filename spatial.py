@@ -0,0 +1,294 @@
+import heapq
+import math
+
+
+# Below this many points k_nearest scans them all instead of walking cells
+LINEAR_SCAN_POINTS = 16
+
+
+class PointGrid():
+    def __init__(self, cell_size=128):
+        """
+        Uniform grid index over static points (e.g. waypoints)
+
+        Args:
+            cell_size: Size of a grid cell in pixels
+        """
+        self.cell_size = cell_size
+        self.cells = {}
+        self.points = {}
+        self.min_cell = None
+        self.max_cell = None
+
+    def __len__(self):
+        return len(self.points)
+
+    def cell_of(self, x, y):
+        """Grid cell containing a position"""
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def clear(self):
+        """Remove every point"""
+        self.cells = {}
+        self.points = {}
+        self.min_cell = None
+        self.max_cell = None
+
+    def build(self, points):
+        """Rebuild the index from a list of (x, y) points, keyed by list index"""
+        self.clear()
+        for index, point in enumerate(points):
+            self.insert(index, point[0], point[1])
+
+    def insert(self, index, x, y):
+        """Add a point under the given index"""
+        cell = self.cell_of(x, y)
+        self.cells.setdefault(cell, []).append(index)
+        self.points[index] = (x, y)
+
+        if self.min_cell is None:
+            self.min_cell = cell
+            self.max_cell = cell
+        else:
+            self.min_cell = (min(self.min_cell[0], cell[0]), min(self.min_cell[1], cell[1]))
+            self.max_cell = (max(self.max_cell[0], cell[0]), max(self.max_cell[1], cell[1]))
+
+    def _ring(self, center, radius):
+        """Yield the cells on the square ring at the given distance from center, inside the occupied bounds"""
+        cx, cy = center
+        min_x, min_y = self.min_cell
+        max_x, max_y = self.max_cell
+        if radius == 0:
+            yield center
+            return
+
+        first_x, last_x = max(cx - radius, min_x), min(cx + radius, max_x)
+        for y in (cy - radius, cy + radius):
+            if min_y <= y <= max_y:
+                for x in range(first_x, last_x + 1):
+                    yield (x, y)
+        first_y, last_y = max(cy - radius + 1, min_y), min(cy + radius - 1, max_y)
+        for x in (cx - radius, cx + radius):
+            if min_x <= x <= max_x:
+                for y in range(first_y, last_y + 1):
+                    yield (x, y)
+
+    def _min_ring(self, center):
+        """Ring distance before which no points can be found"""
+        return max(0, self.min_cell[0] - center[0], center[0] - self.max_cell[0],
+                   self.min_cell[1] - center[1], center[1] - self.max_cell[1])
+
+    def _max_ring(self, center):
+        """Ring distance after which no more points can be found"""
+        return max(abs(center[0] - self.min_cell[0]), abs(center[0] - self.max_cell[0]),
+                   abs(center[1] - self.min_cell[1]), abs(center[1] - self.max_cell[1]))
+
+    def k_nearest(self, pos, k):
+        """
+        Find the k points closest to a position
+
+        Args:
+            pos: Tuple (x, y)
+            k: Number of points to return
+
+        Returns:
+            List of (index, distance) sorted by distance, then index
+        """
+        if not self.points or k <= 0:
+            return []
+
+        px, py = pos
+        if len(self.points) <= LINEAR_SCAN_POINTS:
+            # Walking cells does not pay off for a handful of points
+            found = sorted(((x - px) * (x - px) + (y - py) * (y - py), index)
+                           for index, (x, y) in self.points.items())
+            return [(index, math.sqrt(distance_sq)) for distance_sq, index in found[:k]]
+
+        center = self.cell_of(px, py)
+        # Rings outside the occupied cells are skipped and the rest clipped to them,
+        # so queries far from the points cost no more than ones next to them
+        first_ring = self._min_ring(center)
+        last_ring = self._max_ring(center)
+        # Max-heap of the best k as (-distance_sq, -index)
+        best = []
+
+        for ring in range(first_ring, last_ring + 1):
+            # Any point outside the rings searched so far is at least this far away
+            if len(best) == k:
+                bound = (ring - 1) * self.cell_size
+                if bound > 0 and bound * bound > -best[0][0]:
+                    break
+
+            for cell in self._ring(center, ring):
+                for index in self.cells.get(cell, ()):
+                    x, y = self.points[index]
+                    distance_sq = (x - px) * (x - px) + (y - py) * (y - py)
+                    entry = (-distance_sq, -index)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+
+        result = sorted((-distance_sq, -index) for distance_sq, index in best)
+        return [(index, math.sqrt(distance_sq)) for distance_sq, index in result]
+
+    def nearest(self, pos):
+        """Find the closest point, as (index, distance), or None if empty"""
+        result = self.k_nearest(pos, 1)
+        return result[0] if result else None
+
+    def within_radius(self, pos, radius):
+        """
+        Find all points within a radius of a position
+
+        Returns:
+            List of (index, distance) sorted by distance, then index
+        """
+        if not self.points:
+            return []
+
+        px, py = pos
+        radius_sq = radius * radius
+        first = self.cell_of(px - radius, py - radius)
+        last = self.cell_of(px + radius, py + radius)
+
+        found = []
+        for cx in range(max(first[0], self.min_cell[0]), min(last[0], self.max_cell[0]) + 1):
+            for cy in range(max(first[1], self.min_cell[1]), min(last[1], self.max_cell[1]) + 1):
+                for index in self.cells.get((cx, cy), ()):
+                    x, y = self.points[index]
+                    distance_sq = (x - px) * (x - px) + (y - py) * (y - py)
+                    if distance_sq <= radius_sq:
+                        found.append((distance_sq, index))
+
+        found.sort()
+        return [(index, math.sqrt(distance_sq)) for distance_sq, index in found]
+
+
+class SpatialHash():
+    def __init__(self, cell_size=64):
+        """
+        Uniform grid index over moving sprites (enemies, treasures, ...)
+
+        Each sprite is stored in the cell holding its rect center, so keeping
+        the index in sync is one lookup per sprite and tick. Rect queries look
+        half a sprite further to catch rects reaching in from neighbouring
+        cells. Cells keep their sprites in insertion order, so queries return
+        the same order on every run of a seeded session.
+
+        Args:
+            cell_size: Size of a grid cell in pixels, about twice the size of
+                the indexed sprites works well
+        """
+        self.cell_size = cell_size
+        self.cells = {}
+        self.sprite_cells = {}
+        # Largest half extent of an indexed rect, how far rect queries look beyond their bounds
+        self.margin = 0
+
+    def __len__(self):
+        return len(self.sprite_cells)
+
+    def __contains__(self, sprite):
+        return sprite in self.sprite_cells
+
+    def cell_of(self, x, y):
+        """Grid cell containing a position"""
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def clear(self):
+        """Remove every sprite"""
+        self.cells = {}
+        self.sprite_cells = {}
+        self.margin = 0
+
+    def rebuild(self, sprites):
+        """Rebuild the index from an iterable of sprites"""
+        self.clear()
+        for sprite in sprites:
+            self.insert(sprite)
+
+    def insert(self, sprite):
+        """Add a sprite at the current position of its rect"""
+        rect = sprite.rect
+        cell = self.cell_of(*rect.center)
+        self.sprite_cells[sprite] = cell
+        self.cells.setdefault(cell, {})[sprite] = None
+        self.margin = max(self.margin, (max(rect.width, rect.height) + 1) // 2)
+
+    def remove(self, sprite):
+        """Remove a sprite; unknown sprites are ignored"""
+        cell = self.sprite_cells.pop(sprite, None)
+        if cell is None:
+            return
+        sprites = self.cells[cell]
+        del sprites[sprite]
+        if not sprites:
+            del self.cells[cell]
+
+    def move(self, sprite):
+        """Re-index a sprite after its rect moved"""
+        if self.sprite_cells.get(sprite) != self.cell_of(*sprite.rect.center):
+            self.remove(sprite)
+            self.insert(sprite)
+
+    def update(self, sprites):
+        """Re-index every sprite of an iterable after a simulation tick"""
+        sprite_cells = self.sprite_cells
+        size = self.cell_size
+        for sprite in sprites:
+            x, y = sprite.rect.center
+            if sprite_cells.get(sprite) != (x // size, y // size):
+                self.remove(sprite)
+                self.insert(sprite)
+
+    def query_rect(self, rect):
+        """
+        Find the sprites whose rect overlaps a rect
+
+        Args:
+            rect: pygame Rect in world coordinates
+
+        Returns:
+            List of sprites
+        """
+        cells = self.cells
+        margin = self.margin
+        first_col, first_row = self.cell_of(rect.left - margin, rect.top - margin)
+        last_col, last_row = self.cell_of(rect.right + margin, rect.bottom + margin)
+        colliderect = rect.colliderect
+        found = []
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                sprites = cells.get((col, row))
+                if sprites is not None:
+                    found.extend(sprite for sprite in sprites if colliderect(sprite.rect))
+        return found
+
+    def query_radius(self, pos, radius):
+        """
+        Find the sprites whose rect center lies within a radius of a position
+
+        Args:
+            pos: Tuple (x, y)
+            radius: Search radius in pixels
+
+        Returns:
+            List of (sprite, distance) sorted by distance
+        """
+        cells = self.cells
+        px, py = pos
+        radius_sq = radius * radius
+        first_col, first_row = self.cell_of(px - radius, py - radius)
+        last_col, last_row = self.cell_of(px + radius, py + radius)
+        found = []
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                for sprite in cells.get((col, row), ()):
+                    x, y = sprite.rect.center
+                    distance_sq = (x - px) * (x - px) + (y - py) * (y - py)
+                    if distance_sq <= radius_sq:
+                        found.append((distance_sq, sprite))
+
+        found.sort(key=lambda item: item[0])
+        return [(sprite, math.sqrt(distance_sq)) for distance_sq, sprite in found]
@@ -0,0 +1,198 @@
+"""
+Chunked streaming of the map background
+
+Only the background image is streamed: chunks around the camera are built
+on demand and the rest is evicted. The tile rows, the wall records and the
+CollisionGrid of a level stay fully in memory (about one byte per tile for
+the grid), so maps whose tile data does not fit in memory are not supported.
+"""
+import queue
+import threading
+from collections import OrderedDict
+
+import pygame as pg
+
+
+class ChunkCache():
+    def __init__(self, build_chunk, max_chunks=64, threaded=True):
+        """
+        LRU cache of chunk surfaces built on demand, with background prefetching
+
+        Args:
+            build_chunk: Function (chunk_x, chunk_y) -> pygame Surface or None
+            max_chunks: Number of chunks kept before the least recently used is evicted
+            threaded: Build prefetched chunks in a background thread
+        """
+        self.build_chunk = build_chunk
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()
+
+        # Chunks finished by the worker thread, waiting to be picked up
+        self.ready = OrderedDict()
+        self.pending = set()
+        # Key the worker is building right now, and a condition signalled when it is done
+        self.building = None
+        self.lock = threading.Lock()
+        self.built = threading.Condition(self.lock)
+        self.requests = queue.Queue()
+        self.worker = None
+        if threaded:
+            self.worker = threading.Thread(target=self._work, daemon=True)
+            self.worker.start()
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def get(self, key):
+        """Return the chunk for key, building it now if it is not cached or prefetched"""
+        if key in self.chunks:
+            self.chunks.move_to_end(key)
+            return self.chunks[key]
+
+        with self.lock:
+            # A chunk the worker is already building is waited for, not built twice
+            while key == self.building:
+                self.built.wait()
+            prefetched = key in self.ready
+            chunk = self.ready.pop(key, None)
+            if not prefetched:
+                # Still queued: take it off the worker, which skips keys no longer pending
+                self.pending.discard(key)
+        if not prefetched:
+            chunk = self.build_chunk(*key)
+        elif isinstance(chunk, Exception):
+            raise chunk
+        if chunk is not None and pg.display.get_surface():
+            chunk = chunk.convert()
+
+        self.chunks[key] = chunk
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return chunk
+
+    def prefetch(self, keys):
+        """Queue chunks to be built in the background before they are needed"""
+        if self.worker is None:
+            return
+        with self.lock:
+            for key in keys:
+                if key not in self.chunks and key not in self.ready and key not in self.pending:
+                    self.pending.add(key)
+                    self.requests.put(key)
+
+    def _work(self):
+        """Worker thread: build queued chunks until a None request arrives"""
+        while True:
+            key = self.requests.get()
+            if key is None:
+                break
+            with self.lock:
+                if key not in self.pending:
+                    continue
+                self.building = key
+            # A failed build is handed to get() as its result and raised there
+            chunk = None
+            try:
+                chunk = self.build_chunk(*key)
+            except Exception as e:
+                chunk = e
+            finally:
+                with self.lock:
+                    self.pending.discard(key)
+                    self.building = None
+                    self.ready[key] = chunk
+                    while len(self.ready) > self.max_chunks:
+                        self.ready.popitem(last=False)
+                    self.built.notify_all()
+
+    def clear(self):
+        """Drop all cached chunks"""
+        with self.lock:
+            self.chunks.clear()
+            self.ready.clear()
+
+    def close(self):
+        """Stop the worker thread, dropping the chunks still queued for it"""
+        if self.worker is not None:
+            with self.lock:
+                # The worker skips keys that are no longer pending
+                self.pending.clear()
+            self.requests.put(None)
+            self.worker = None
+
+
+def visible_chunks(camera_x, camera_y, view_width, view_height, chunk_size, cols, rows):
+    """Return the (first_x, first_y, last_x, last_y) chunk range overlapping the view"""
+    first_x = max(0, int(camera_x) // chunk_size)
+    first_y = max(0, int(camera_y) // chunk_size)
+    last_x = min(cols - 1, int(camera_x + view_width) // chunk_size)
+    last_y = min(rows - 1, int(camera_y + view_height) // chunk_size)
+    return first_x, first_y, last_x, last_y
+
+
+class ChunkedSurface():
+    def __init__(self, width, height, chunk_size, build_chunk, max_chunks=64, threaded=True):
+        """
+        Map-sized image that only keeps the chunks around the camera in memory
+
+        It can stand in for the map Surface given to World: World.draw and
+        anything using get_width/get_height keep working. Only the image is
+        streamed; the level's tile data stays resident.
+
+        Args:
+            width, height: Size of the whole image in pixels
+            chunk_size: Size of a chunk in pixels
+            build_chunk: Function (x, y, width, height) -> Surface for that region
+            max_chunks: Number of chunks kept in memory
+            threaded: Prefetch chunks in a background thread
+        """
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.cols = (width + chunk_size - 1) // chunk_size
+        self.rows = (height + chunk_size - 1) // chunk_size
+        self.build_region = build_chunk
+        self.cache = ChunkCache(self._build, max_chunks, threaded)
+        self.last_camera = None
+
+    def get_width(self):
+        return self.width
+
+    def get_height(self):
+        return self.height
+
+    def get_size(self):
+        return self.width, self.height
+
+    def _build(self, chunk_x, chunk_y):
+        """Build the region covered by one chunk"""
+        x = chunk_x * self.chunk_size
+        y = chunk_y * self.chunk_size
+        return self.build_region(x, y, min(self.chunk_size, self.width - x), min(self.chunk_size, self.height - y))
+
+    def draw(self, surface, camera_x=0, camera_y=0):
+        """Draw the chunks overlapping the view and prefetch ahead of the camera"""
+        first_x, first_y, last_x, last_y = visible_chunks(
+            camera_x, camera_y, surface.get_width(), surface.get_height(), self.chunk_size, self.cols, self.rows)
+
+        for chunk_y in range(first_y, last_y + 1):
+            for chunk_x in range(first_x, last_x + 1):
+                chunk = self.cache.get((chunk_x, chunk_y))
+                surface.blit(chunk, (chunk_x * self.chunk_size - camera_x, chunk_y * self.chunk_size - camera_y))
+
+        # Prefetch the next row/column of chunks in the direction of travel
+        if self.last_camera is not None:
+            step_x = (camera_x > self.last_camera[0]) - (camera_x < self.last_camera[0])
+            step_y = (camera_y > self.last_camera[1]) - (camera_y < self.last_camera[1])
+            if step_x or step_y:
+                ahead = []
+                for chunk_y in range(first_y + step_y, last_y + step_y + 1):
+                    for chunk_x in range(first_x + step_x, last_x + step_x + 1):
+                        if 0 <= chunk_x < self.cols and 0 <= chunk_y < self.rows:
+                            ahead.append((chunk_x, chunk_y))
+                self.cache.prefetch(ahead)
+        self.last_camera = (camera_x, camera_y)
+
+    def close(self):
+        """Stop background prefetching"""
+        self.cache.close()
@@ -0,0 +1,353 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import rng
+from enemy import BOB_OFFSETS, FRAME_NORMAL, FRAME_CHASING
+
+# Behavior mode codes stored in the mode array
+MODE_PATROL = 0
+MODE_WANDER = 1
+MODE_GUARD = 2
+MODE_CHASE = 3
+MODE_CODES = {'patrol': MODE_PATROL, 'wander': MODE_WANDER, 'guard': MODE_GUARD, 'chase': MODE_CHASE}
+
+PATROL_REACHED = 10
+
+# Same neighbour order and weights as pathfinding.NEIGHBOURS
+FLOW_OFFSETS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+class EnemySwarm():
+    def __init__(self, enemies, collision_grid, flow_field=None, seed=None, field_of_view=None):
+        """
+        Struct-of-arrays backend that updates every enemy in batched NumPy operations
+
+        Enemy sprites are only used for drawing and player collision; their
+        rects are synced back from the arrays for enemies near the view.
+        Enemies are assumed to be no larger than a tile.
+
+        Args:
+            enemies: Iterable of Enemy sprites to take over
+            collision_grid: CollisionGrid describing solid tiles
+            flow_field: Optional shared FlowField leading to the player
+            seed: Optional seed for the wander/guard direction rolls, derived
+                from the global seed (see rng.py) when None
+            field_of_view: Optional shared FieldOfView of the player; enemies
+                only detect the player from visible tiles
+        """
+        if np is None:
+            raise RuntimeError("EnemySwarm requires numpy")
+
+        self.sprites = list(enemies)
+        self.grid = collision_grid
+        self.flow_field = flow_field
+        self.field_of_view = field_of_view
+        self.rng = np.random.default_rng(seed if seed is not None else rng.derive_seed("swarm"))
+
+        self.solid = np.frombuffer(collision_grid.solid, dtype=np.uint8).reshape(
+            collision_grid.rows, collision_grid.cols)
+        self.cardinal = np.array([(1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.float64)
+        self.guard_moves = np.array([(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)], dtype=np.float64)
+        self.flow_offsets = np.array(FLOW_OFFSETS, dtype=np.int64)
+        self.flow_vectors = self.flow_offsets / np.hypot(self.flow_offsets[:, 0], self.flow_offsets[:, 1])[:, None]
+        self.bob_offsets = np.array(BOB_OFFSETS, dtype=np.int64)
+
+        count = len(self.sprites)
+        self.pos = np.zeros((count, 2))
+        self.size = np.zeros((count, 2), dtype=np.int64)
+        self.direction = np.zeros((count, 2))
+        self.speed = np.zeros(count)
+        self.change_timer = np.zeros(count, dtype=np.int64)
+        self.change_interval = np.zeros(count, dtype=np.int64)
+        self.chase = np.zeros(count, dtype=bool)
+        self.chase_range = np.zeros(count)
+        self.lost_timer = np.zeros(count, dtype=np.int64)
+        self.lost_limit = np.zeros(count, dtype=np.int64)
+        self.has_last_known = np.zeros(count, dtype=bool)
+        self.last_known = np.zeros((count, 2))
+        self.mode = np.zeros(count, dtype=np.int8)
+        self.patrol_points = np.zeros((count, 4, 2))
+        self.patrol_index = np.zeros(count, dtype=np.int64)
+        self.guard_pos = np.zeros((count, 2))
+        self.guard_radius = np.zeros(count)
+        self.animation_frame = np.zeros(count, dtype=np.int64)
+
+        for i, enemy in enumerate(self.sprites):
+            self.load_enemy(i, enemy)
+
+    def reset(self):
+        """Reload every enemy from its sprite, e.g. after the sprites were reset"""
+        for i, enemy in enumerate(self.sprites):
+            self.load_enemy(i, enemy)
+        self.animation_frame[:] = 0
+
+    def load_enemy(self, i, enemy):
+        """Copy the state of one Enemy sprite into the arrays"""
+        self.pos[i] = enemy.rect.center
+        self.size[i] = enemy.rect.size
+        self.direction[i] = enemy.direction
+        self.speed[i] = enemy.speed
+        self.change_timer[i] = enemy.change_timer
+        self.change_interval[i] = enemy.change_direction_interval
+        self.chase[i] = enemy.chase_player
+        self.chase_range[i] = enemy.chase_range
+        self.lost_timer[i] = enemy.lost_player_timer
+        self.lost_limit[i] = enemy.lost_player_limit
+        self.has_last_known[i] = enemy.last_known_player_pos is not None
+        if enemy.last_known_player_pos is not None:
+            self.last_known[i] = enemy.last_known_player_pos
+        self.mode[i] = MODE_CODES.get(enemy.behavior_mode, MODE_WANDER)
+
+        # Default patrol square starts from the spawn position
+        x, y = enemy.rect.center
+        points = enemy.patrol_points[:4] or [(x + 100, y), (x + 100, y + 100), (x, y + 100), (x, y)]
+        while len(points) < 4:
+            points = list(points) + [points[-1]]
+        self.patrol_points[i] = points
+        self.patrol_index[i] = enemy.current_patrol_index % 4
+        self.guard_pos[i] = enemy.guard_position
+        self.guard_radius[i] = enemy.guard_radius
+
+    def __len__(self):
+        return len(self.sprites)
+
+    def set_chase_mode(self, enabled, chase_range=None):
+        """Enable or disable chasing for the whole swarm"""
+        self.chase[:] = enabled
+        if enabled:
+            self.mode[:] = MODE_CHASE
+        for i, enemy in enumerate(self.sprites):
+            enemy.set_chase_mode(enabled, chase_range)
+            self.chase_range[i] = enemy.chase_range
+
+    def update(self, player_pos=None):
+        """Advance every enemy by one frame"""
+        if not len(self.sprites):
+            return
+
+        self.change_timer += 1
+        chasing = np.zeros(len(self.sprites), dtype=bool)
+        target = self.last_known.copy()
+
+        if player_pos is not None:
+            player = np.asarray(player_pos, dtype=np.float64)
+            delta = player - self.pos
+            distance_sq = np.einsum('ij,ij->i', delta, delta)
+
+            in_range = self.chase & (distance_sq < self.chase_range ** 2)
+            if self.field_of_view is not None:
+                in_range &= self.sees_player()
+            investigating = (self.chase & ~in_range & self.has_last_known
+                             & (self.lost_timer < self.lost_limit))
+
+            self.last_known[in_range] = player
+            self.has_last_known |= in_range
+            self.lost_timer[in_range] = 0
+            self.lost_timer[investigating] += 1
+
+            chasing = in_range | investigating
+            target[in_range] = player
+            self.chase_behavior(chasing, target)
+
+        self.fallback_behavior(~chasing)
+        self.apply_movement(chasing, target, player_pos is not None)
+        self.animation_frame = (self.animation_frame + 1) % len(self.bob_offsets)
+
+    def sees_player(self):
+        """Mask of enemies standing on a tile in the player's field of view"""
+        grid = self.grid
+        visible = np.frombuffer(self.field_of_view.visible, dtype=np.uint8).reshape(grid.rows, grid.cols)
+        tiles = self.pos.astype(np.int64) // grid.tile_size
+        cols = np.clip(tiles[:, 0], 0, grid.cols - 1)
+        rows = np.clip(tiles[:, 1], 0, grid.rows - 1)
+        return visible[rows, cols] == 1
+
+    def chase_behavior(self, mask, target):
+        """Steer chasing enemies along the flow field or straight at their target"""
+        if not mask.any():
+            return
+
+        delta = target[mask] - self.pos[mask]
+        distance = np.hypot(delta[:, 0], delta[:, 1])
+        moving = distance > 0
+        unit = np.zeros_like(delta)
+        unit[moving] = delta[moving] / distance[moving, None]
+        keep = ~moving
+
+        flow_unit, has_flow = self.flow_directions(np.flatnonzero(mask), target[mask])
+        unit[has_flow] = flow_unit[has_flow]
+        keep &= ~has_flow
+
+        speed = self.speed[mask]
+        direction = unit * speed[:, None]
+        # Enemies sitting exactly on their target keep their previous direction
+        direction[keep] = self.direction[mask][keep]
+        self.direction[mask] = direction
+
+    def flow_directions(self, indexes, targets):
+        """
+        Sample the shared flow field for a batch of enemies
+
+        Returns:
+            Tuple of (unit vectors, mask of enemies that got a flow direction)
+        """
+        count = len(indexes)
+        unit = np.zeros((count, 2))
+        found = np.zeros(count, dtype=bool)
+        flow = self.flow_field
+        if flow is None or flow.target_tile is None or not count:
+            return unit, found
+
+        grid = self.grid
+        tile_size = grid.tile_size
+        target_tiles = targets.astype(np.int64) // tile_size
+        follows = (target_tiles[:, 0] == flow.target_tile[0]) & (target_tiles[:, 1] == flow.target_tile[1])
+        if not follows.any():
+            return unit, found
+
+        distance = np.frombuffer(flow.distance, dtype=np.int32 if flow.distance.itemsize == 4 else np.int64)
+        distance = distance.reshape(grid.rows, grid.cols)
+
+        tiles = self.pos[indexes].astype(np.int64) // tile_size
+        cols = tiles[:, 0]
+        rows = tiles[:, 1]
+        inside = (cols >= 0) & (cols < grid.cols) & (rows >= 0) & (rows < grid.rows)
+        current = np.full(count, -1, dtype=np.int64)
+        current[inside] = distance[rows[inside], cols[inside]]
+        candidates = follows & inside & (current > 0)
+
+        best = np.full(count, -1, dtype=np.int64)
+        best_distance = np.where(candidates, current, 0)
+        for i, (dx, dy) in enumerate(FLOW_OFFSETS):
+            next_cols = cols + dx
+            next_rows = rows + dy
+            valid = candidates & self.is_free(next_cols, next_rows)
+            if dx and dy:
+                valid &= self.is_free(cols + dx, rows) & self.is_free(cols, rows + dy)
+            neighbour = np.full(count, -1, dtype=np.int64)
+            neighbour[valid] = distance[next_rows[valid], next_cols[valid]]
+            better = valid & (neighbour != -1) & (neighbour < best_distance)
+            best[better] = i
+            best_distance[better] = neighbour[better]
+
+        found = best >= 0
+        unit[found] = self.flow_vectors[best[found]]
+        return unit, found
+
+    def is_free(self, cols, rows):
+        """Vectorized check for free tiles; outside the grid counts as solid"""
+        inside = (cols >= 0) & (cols < self.grid.cols) & (rows >= 0) & (rows < self.grid.rows)
+        free = np.zeros(len(cols), dtype=bool)
+        free[inside] = self.solid[rows[inside], cols[inside]] == 0
+        return free
+
+    def axis_direction(self, delta):
+        """Axis-aligned unit direction along the dominant component of delta"""
+        horizontal = np.abs(delta[:, 0]) > np.abs(delta[:, 1])
+        direction = np.zeros_like(delta)
+        direction[horizontal, 0] = np.where(delta[horizontal, 0] > 0, 1, -1)
+        direction[~horizontal, 1] = np.where(delta[~horizontal, 1] > 0, 1, -1)
+        return direction
+
+    def fallback_behavior(self, mask):
+        """Run patrol, guard and wander behaviors for enemies that are not chasing"""
+        timer_up = self.change_timer > self.change_interval
+
+        # Patrol: head for the current patrol point, advance when reached
+        patrol = mask & (self.mode == MODE_PATROL)
+        if patrol.any():
+            indexes = np.flatnonzero(patrol)
+            delta = self.patrol_points[indexes, self.patrol_index[indexes]] - self.pos[indexes]
+            reached = np.einsum('ij,ij->i', delta, delta) < PATROL_REACHED ** 2
+            self.patrol_index[indexes[reached]] = (self.patrol_index[indexes[reached]] + 1) % 4
+            moving = indexes[~reached]
+            self.direction[moving] = self.axis_direction(delta[~reached])
+
+        # Guard: return to the post, otherwise shuffle around it
+        guard = mask & (self.mode == MODE_GUARD)
+        if guard.any():
+            indexes = np.flatnonzero(guard)
+            delta = self.guard_pos[indexes] - self.pos[indexes]
+            away = np.einsum('ij,ij->i', delta, delta) > self.guard_radius[indexes] ** 2
+            self.direction[indexes[away]] = self.axis_direction(delta[away])
+
+            idle = indexes[~away & timer_up[indexes]]
+            self.direction[idle] = self.guard_moves[self.rng.integers(0, len(self.guard_moves), len(idle))]
+            self.change_timer[idle] = 0
+
+        # Wander (also used by chase-mode enemies without a target)
+        wander = mask & ((self.mode == MODE_WANDER) | (self.mode == MODE_CHASE)) & timer_up
+        if wander.any():
+            indexes = np.flatnonzero(wander)
+            self.direction[indexes] = self.cardinal[self.rng.integers(0, 4, len(indexes))]
+            self.change_timer[indexes] = 0
+
+    def apply_movement(self, chasing, target, has_player):
+        """Move all enemies and undo moves that end inside a wall"""
+        new_pos = np.trunc(self.pos + self.direction * self.speed[:, None])
+        blocked = self.overlaps_wall(new_pos)
+        self.pos = np.where(blocked[:, None], self.pos, new_pos)
+
+        if not blocked.any():
+            return
+
+        # Chasing enemies try a perpendicular axis, others pick a new random direction
+        navigate = blocked & self.chase & has_player
+        if navigate.any():
+            indexes = np.flatnonzero(navigate)
+            delta = target[indexes] - self.pos[indexes]
+            flow_unit, has_flow = self.flow_directions(indexes, target[indexes])
+            delta[has_flow] = flow_unit[has_flow]
+            horizontal = np.abs(delta[:, 0]) > np.abs(delta[:, 1])
+            direction = np.zeros_like(delta)
+            direction[horizontal, 1] = np.where(delta[horizontal, 1] > 0, 1, -1)
+            direction[~horizontal, 0] = np.where(delta[~horizontal, 0] > 0, 1, -1)
+            self.direction[indexes] = direction
+
+        turn = np.flatnonzero(blocked & ~navigate)
+        self.direction[turn] = self.cardinal[self.rng.integers(0, 4, len(turn))]
+
+    def overlaps_wall(self, centers):
+        """Check the four corners of each enemy rect against the solid grid"""
+        tile_size = self.grid.tile_size
+        left = (centers[:, 0] - self.size[:, 0] // 2).astype(np.int64)
+        top = (centers[:, 1] - self.size[:, 1] // 2).astype(np.int64)
+        right = left + self.size[:, 0] - 1
+        bottom = top + self.size[:, 1] - 1
+
+        blocked = np.zeros(len(centers), dtype=bool)
+        for x in (left, right):
+            for y in (top, bottom):
+                blocked |= ~self.is_free(x // tile_size, y // tile_size)
+        return blocked
+
+    def sync(self, view_rect=None):
+        """
+        Copy positions and visual state back to the sprites
+
+        Args:
+            view_rect: Optional pygame Rect in world coordinates; only enemies
+                overlapping it are synced
+        """
+        if not len(self.sprites):
+            return
+
+        if view_rect is None:
+            visible = np.arange(len(self.sprites))
+        else:
+            half = self.size / 2
+            visible = np.flatnonzero(
+                (self.pos[:, 0] + half[:, 0] >= view_rect.left) &
+                (self.pos[:, 0] - half[:, 0] <= view_rect.right) &
+                (self.pos[:, 1] + half[:, 1] >= view_rect.top) &
+                (self.pos[:, 1] - half[:, 1] <= view_rect.bottom))
+
+        chasing = self.chase & self.has_last_known
+        bob = self.bob_offsets[self.animation_frame]
+        for i in visible.tolist():
+            enemy = self.sprites[i]
+            enemy.rect.center = (int(self.pos[i, 0]), int(self.pos[i, 1]))
+            enemy.image = enemy.frames[FRAME_CHASING if chasing[i] else FRAME_NORMAL]
+            enemy.bob_offset = int(bob[i])
@@ -0,0 +1,84 @@
+import pygame as pg
+from collections import OrderedDict
+
+# Fonts are expensive to create, so each (name, size) is loaded only once
+_fonts = {}
+
+
+def get_font(name=None, size=24):
+    """Return a shared SysFont for the given name and size"""
+    key = (name, size)
+    font = _fonts.get(key)
+    if font is None:
+        font = pg.font.SysFont(name, size)
+        _fonts[key] = font
+    return font
+
+
+class TextCache():
+    def __init__(self, max_entries=256):
+        """
+        LRU cache of rendered text surfaces
+
+        Args:
+            max_entries: Number of rendered surfaces kept before the oldest is evicted
+        """
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+
+    def render(self, text, color=(255, 255, 255), font_name=None, size=24, antialias=True):
+        """Return a rendered surface for the text, rendering it only on a cache miss"""
+        key = (text, color, font_name, size, antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+
+        surface = get_font(font_name, size).render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        """Drop all rendered surfaces"""
+        self.surfaces.clear()
+
+
+# Shared cache used by the world overlays and the HUD
+text_cache = TextCache()
+
+
+def render_text(text, color=(255, 255, 255), font_name=None, size=24, antialias=True):
+    """Render text through the shared cache"""
+    return text_cache.render(text, color, font_name, size, antialias)
+
+
+class HudText():
+    def __init__(self, template, pos, color=(255, 255, 255), font_name=None, size=24):
+        """
+        HUD label that re-renders only when its value changes
+
+        Args:
+            template: Format string, e.g. "Health: {}/100"
+            pos: Top-left screen position
+            color: Text color
+            font_name, size: Font used for rendering
+        """
+        self.template = template
+        self.pos = pos
+        self.color = color
+        self.font = get_font(font_name, size)
+        self.value = None
+        self.image = None
+
+    def set_value(self, value):
+        """Update the displayed value, re-rendering only if it changed"""
+        if self.image is None or value != self.value:
+            self.value = value
+            self.image = self.font.render(self.template.format(value), True, self.color)
+
+    def draw(self, surface, value):
+        """Draw the label with the given value, returning the rect drawn"""
+        self.set_value(value)
+        return surface.blit(self.image, self.pos)
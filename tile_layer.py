@@ -0,0 +1,95 @@
+import pygame as pg
+from streaming import ChunkCache
+
+
+class StaticTileLayer():
+    def __init__(self, tiles, tile_size, map_width, map_height, chunk_tiles=16, max_chunks=None):
+        """
+        Bake static tile sprites (walls) into fixed-size chunk surfaces
+
+        Args:
+            tiles: Iterable of objects with .image and .rect (e.g. the wall group)
+            tile_size: Size of a single tile in pixels
+            map_width, map_height: Size of the whole map in pixels
+            chunk_tiles: Number of tiles along each side of a chunk
+            max_chunks: When given, chunks are baked on demand and only this
+                many are kept in memory (streaming mode for huge maps)
+        """
+        self.tile_size = tile_size
+        self.chunk_size = chunk_tiles * tile_size
+        self.width = map_width
+        self.height = map_height
+        self.colorkey = (255, 0, 255)
+
+        # Only chunks that actually contain tiles are stored
+        self.chunks = {}
+        self.chunk_tiles = {}
+        self.cache = None
+        if max_chunks is None:
+            self.bake(tiles)
+        else:
+            self.bucket(tiles)
+            self.cache = ChunkCache(self.bake_chunk, max_chunks, threaded=False)
+
+    def bucket(self, tiles):
+        """Group tiles by chunk without drawing anything yet"""
+        self.chunk_tiles = {}
+        for tile in tiles:
+            key = (tile.rect.x // self.chunk_size, tile.rect.y // self.chunk_size)
+            self.chunk_tiles.setdefault(key, []).append(tile)
+
+    def bake_chunk(self, chunk_x, chunk_y):
+        """Draw a single chunk from its bucket of tiles"""
+        chunk = self.create_chunk()
+        for tile in self.chunk_tiles.get((chunk_x, chunk_y), ()):
+            chunk.blit(tile.image, (tile.rect.x - chunk_x * self.chunk_size,
+                                    tile.rect.y - chunk_y * self.chunk_size))
+        return chunk
+
+    def get_chunk(self, key):
+        """Return the surface of a chunk, or None if it holds no tiles"""
+        if self.cache is None:
+            return self.chunks.get(key)
+        if key not in self.chunk_tiles:
+            return None
+        return self.cache.get(key)
+
+    def bake(self, tiles):
+        """Draw every tile image into the chunk it belongs to"""
+        self.chunks = {}
+        for tile in tiles:
+            chunk_x = tile.rect.x // self.chunk_size
+            chunk_y = tile.rect.y // self.chunk_size
+            chunk = self.chunks.get((chunk_x, chunk_y))
+            if chunk is None:
+                chunk = self.create_chunk()
+                self.chunks[(chunk_x, chunk_y)] = chunk
+
+            chunk.blit(tile.image, (tile.rect.x - chunk_x * self.chunk_size,
+                                    tile.rect.y - chunk_y * self.chunk_size))
+
+        # Convert once to display format for faster blitting
+        if pg.display.get_surface():
+            for key, chunk in self.chunks.items():
+                self.chunks[key] = chunk.convert()
+
+    def create_chunk(self):
+        """Create an empty, transparent chunk surface"""
+        chunk = pg.Surface((self.chunk_size, self.chunk_size))
+        chunk.fill(self.colorkey)
+        chunk.set_colorkey(self.colorkey, pg.RLEACCEL)
+        return chunk
+
+    def draw(self, surface, camera_x=0, camera_y=0):
+        """Draw only the chunks overlapping the camera view"""
+        first_x = max(0, int(camera_x) // self.chunk_size)
+        first_y = max(0, int(camera_y) // self.chunk_size)
+        last_x = int(camera_x + surface.get_width()) // self.chunk_size
+        last_y = int(camera_y + surface.get_height()) // self.chunk_size
+
+        for chunk_y in range(first_y, last_y + 1):
+            for chunk_x in range(first_x, last_x + 1):
+                chunk = self.get_chunk((chunk_x, chunk_y))
+                if chunk is not None:
+                    surface.blit(chunk, (chunk_x * self.chunk_size - camera_x,
+                                         chunk_y * self.chunk_size - camera_y))
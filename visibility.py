@@ -0,0 +1,119 @@
+# Octant transforms (xx, xy, yx, yy) mapping shadowcasting rows into map space
+OCTANTS = ((1, 0, 0, 1), (0, 1, 1, 0), (0, -1, 1, 0), (-1, 0, 0, 1),
+           (-1, 0, 0, -1), (0, -1, -1, 0), (0, 1, -1, 0), (1, 0, 0, -1))
+
+
+class FieldOfView():
+    def __init__(self, collision_grid, radius):
+        """
+        Tiles visible from the player, by recursive shadowcasting
+
+        The field is recomputed only when the player moves to another tile
+        and is shared by every enemy: an enemy sees the player when its own
+        tile is lit, an O(1) lookup.
+
+        Args:
+            collision_grid: CollisionGrid describing solid (opaque) tiles
+            radius: View distance in tiles
+        """
+        self.grid = collision_grid
+        self.radius = radius
+        self.origin_tile = None
+
+        # One byte per tile, row-major: 1 = visible; lit keeps the indexes to clear
+        self.visible = bytearray(collision_grid.cols * collision_grid.rows)
+        self.lit = []
+
+    def tile_of(self, x, y):
+        """Convert a pixel position to a tile position"""
+        return int(x) // self.grid.tile_size, int(y) // self.grid.tile_size
+
+    def update(self, origin_pos):
+        """
+        Recompute the field if the origin has moved to a different tile
+
+        Returns:
+            True if the field was recomputed, False otherwise
+        """
+        origin_tile = self.tile_of(*origin_pos)
+        if origin_tile == self.origin_tile:
+            return False
+        self.compute(*origin_tile)
+        return True
+
+    def compute(self, col, row):
+        """Light every tile within the radius that has a clear line to (col, row)"""
+        visible = self.visible
+        for index in self.lit:
+            visible[index] = 0
+        self.lit = []
+        self.origin_tile = (col, row)
+
+        grid = self.grid
+        if not (0 <= col < grid.cols and 0 <= row < grid.rows):
+            return
+        self.light(row * grid.cols + col)
+        for xx, xy, yx, yy in OCTANTS:
+            self.cast_light(col, row, 1, 1.0, 0.0, xx, xy, yx, yy)
+
+    def light(self, index):
+        if not self.visible[index]:
+            self.visible[index] = 1
+            self.lit.append(index)
+
+    def cast_light(self, origin_col, origin_row, distance, start_slope, end_slope, xx, xy, yx, yy):
+        """Scan one octant row by row, recursing around each run of opaque tiles"""
+        if start_slope < end_slope:
+            return
+        grid = self.grid
+        cols = grid.cols
+        rows = grid.rows
+        solid = grid.solid
+        radius = self.radius
+        radius_sq = radius * radius
+
+        for depth in range(distance, radius + 1):
+            blocked = False
+            next_start = start_slope
+            dy = -depth
+            for dx in range(-depth, 1):
+                left_slope = (dx - 0.5) / (dy + 0.5)
+                right_slope = (dx + 0.5) / (dy - 0.5)
+                if start_slope < right_slope:
+                    continue
+                if end_slope > left_slope:
+                    break
+
+                col = origin_col + dx * xx + dy * xy
+                row = origin_row + dx * yx + dy * yy
+                # Tiles off the map block sight like walls
+                inside = 0 <= col < cols and 0 <= row < rows
+                index = row * cols + col
+                opaque = not inside or solid[index]
+                if inside and dx * dx + dy * dy <= radius_sq:
+                    self.light(index)
+
+                if blocked:
+                    if opaque:
+                        next_start = right_slope
+                    else:
+                        blocked = False
+                        start_slope = next_start
+                elif opaque and depth < radius:
+                    # Scan the part of the next rows this wall does not hide
+                    blocked = True
+                    self.cast_light(origin_col, origin_row, depth + 1, start_slope, left_slope, xx, xy, yx, yy)
+                    next_start = right_slope
+            if blocked:
+                break
+
+    def is_visible(self, col, row):
+        """Check if a tile is visible; tiles off the map never are"""
+        grid = self.grid
+        if 0 <= col < grid.cols and 0 <= row < grid.rows:
+            return self.visible[row * grid.cols + col] == 1
+        return False
+
+    def is_visible_at(self, x, y):
+        """Check if the tile under a pixel position is visible"""
+        return self.is_visible(*self.tile_of(x, y))
@@ -0,0 +1,94 @@
+import pygame as pg
+from collision import WALL_TILES
+
+
+def draw_wall_tile(surface, wall_type, size, rng):
+    """
+    Draw one wall tile texture
+
+    Args:
+        surface: Surface of at least size x size to draw into, at (0, 0)
+        wall_type: One of WALL_TILES
+        size: Tile size in pixels
+        rng: random.Random used for the decoration of 'W' walls
+    """
+    if wall_type == 'W':
+        surface.fill((139, 69, 19))
+        for _ in range(5):
+            rect_x = rng.randint(2, size - 6)
+            rect_y = rng.randint(2, size - 6)
+            pg.draw.rect(surface, (160, 82, 45), (rect_x, rect_y, 4, 4))
+    elif wall_type == 'B':
+        surface.fill((105, 105, 105))
+        pg.draw.line(surface, (169, 169, 169), (0, size // 3), (size, size // 3), 2)
+        pg.draw.line(surface, (169, 169, 169), (0, 2 * size // 3), (size, 2 * size // 3), 2)
+    elif wall_type == 'S':
+        surface.fill((128, 128, 128))
+        pg.draw.line(surface, (64, 64, 64), (size // 4, 0), (3 * size // 4, size), 2)
+    elif wall_type == 'L':
+        surface.fill((255, 69, 0))
+        pg.draw.circle(surface, (255, 140, 0), (size // 2, size // 2), size // 3)
+    elif wall_type == 'I':
+        surface.fill((173, 216, 230))
+        pg.draw.polygon(surface, (255, 255, 255), [(size // 2, 5), (size // 2 - 3, 15), (size // 2 + 3, 15)])
+
+    pg.draw.rect(surface, (0, 0, 0), (0, 0, size, size), 2)
+
+
+class WallAtlas():
+    def __init__(self, tile_size, rng, variants=8):
+        """
+        One surface holding a few pre-drawn variants of every wall type
+
+        The atlas is drawn on first use, so headless games that never draw
+        walls never build it. Walls only keep a variant index into it.
+
+        Args:
+            tile_size: Size of a single tile in pixels
+            rng: random.Random for the decorated variants
+            variants: Number of variants of decorated types ('W'); plain
+                types have a single one
+        """
+        self.tile_size = tile_size
+        self.rng = rng
+        self.variants = variants
+        self.surface = None
+        self.images = {}
+
+    def variant_count(self, wall_type):
+        """Number of variants drawn for a wall type"""
+        return self.variants if wall_type == 'W' else 1
+
+    def variant_at(self, wall_type, col, row):
+        """Pick the variant for a wall tile, stable for a given map position"""
+        count = self.variant_count(wall_type)
+        if count == 1:
+            return 0
+        h = (col * 73856093) ^ (row * 19349663)
+        # Fold the high bits in, the low ones alone repeat every few tiles
+        return (h ^ (h >> 13)) % count
+
+    def build(self):
+        """Draw every variant into the atlas surface and cut it into subsurfaces"""
+        size = self.tile_size
+        surface = pg.Surface((size * self.variants, size * len(WALL_TILES)))
+        for row, wall_type in enumerate(WALL_TILES):
+            for variant in range(self.variant_count(wall_type)):
+                tile = surface.subsurface((variant * size, row * size, size, size))
+                draw_wall_tile(tile, wall_type, size, self.rng)
+
+        # Convert once to display format for faster blitting
+        if pg.display.get_surface():
+            surface = surface.convert()
+        self.surface = surface
+
+        self.images = {}
+        for row, wall_type in enumerate(WALL_TILES):
+            self.images[wall_type] = [surface.subsurface((variant * size, row * size, size, size))
+                                      for variant in range(self.variant_count(wall_type))]
+
+    def get(self, wall_type, variant=0):
+        """Return the image of a wall variant, building the atlas if needed"""
+        if self.surface is None:
+            self.build()
+        return self.images[wall_type][variant]
@@ -0,0 +1,100 @@
+import heapq
+import math
+from array import array
+
+NO_HOP = -1
+
+
+class WaypointGraph():
+    def __init__(self, points, polylines, link_distance=None, point_index=None):
+        """
+        Navigation graph over waypoints with cached next-hop tables
+
+        Args:
+            points: List of (x, y) waypoints
+            polylines: List of index lists; consecutive indexes are connected
+            link_distance: Optional distance for extra links between nearby waypoints
+            point_index: Optional PointGrid over points, used to find the extra links
+        """
+        self.points = points
+        self.neighbours = [[] for _ in points]
+
+        for polyline in polylines:
+            for a, b in zip(polyline, polyline[1:]):
+                self.connect(a, b)
+
+        if link_distance and point_index is not None:
+            for a, point in enumerate(points):
+                for b, distance in point_index.within_radius(point, link_distance):
+                    if b > a:
+                        self.connect(a, b, distance)
+
+        # Next-hop rows keyed by destination, filled on demand
+        self.next_hop = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    def connect(self, a, b, distance=None):
+        """Add an undirected edge, ignoring duplicates and self-links"""
+        if a == b or any(n == b for n, _ in self.neighbours[a]):
+            return
+        if distance is None:
+            distance = math.dist(self.points[a], self.points[b])
+        self.neighbours[a].append((b, distance))
+        self.neighbours[b].append((a, distance))
+
+    def build_next_hops(self, destination):
+        """
+        Run Dijkstra from the destination and store, for every waypoint,
+        the neighbour to step to in order to get there
+        """
+        count = len(self.points)
+        hops = array('i', [NO_HOP]) * count
+        distances = [math.inf] * count
+        distances[destination] = 0
+        hops[destination] = destination
+        queue = [(0, destination)]
+
+        while queue:
+            distance, node = heapq.heappop(queue)
+            if distance > distances[node]:
+                continue
+            for neighbour, weight in self.neighbours[node]:
+                new_distance = distance + weight
+                if new_distance < distances[neighbour]:
+                    distances[neighbour] = new_distance
+                    # The graph is undirected, so stepping back along the
+                    # search tree leads to the destination
+                    hops[neighbour] = node
+                    heapq.heappush(queue, (new_distance, neighbour))
+
+        self.next_hop[destination] = hops
+        return hops
+
+    def precompute(self):
+        """Fill the next-hop table for every destination (all pairs)"""
+        for destination in range(len(self.points)):
+            if destination not in self.next_hop:
+                self.build_next_hops(destination)
+
+    def get_path(self, start, end):
+        """
+        Get the shortest path between two waypoints
+
+        Returns:
+            List of waypoint indexes from start to end, or [] if unreachable
+        """
+        hops = self.next_hop.get(end)
+        if hops is None:
+            hops = self.build_next_hops(end)
+
+        if hops[start] == NO_HOP:
+            return []
+
+        path = [start]
+        node = start
+        while node != end:
+            node = hops[node]
+            path.append(node)
+        return path
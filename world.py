@@ -1,17 +1,28 @@
 import pygame as pg
 import json
+from text_cache import render_text
+from spatial import PointGrid
+from waypoint_graph import WaypointGraph
+from collision import CollisionGrid, WALL_TILES
+import level_format
 
 
 class World():
-    def __init__(self, data, map_image):
+    def __init__(self, data, map_image, waypoint_link_distance=None):
         """
         Initialize the World class
 
         Args:
             data: Dictionary containing map data (can be from Tiled JSON or custom format)
-            map_image: pygame Surface for the map background
+            map_image: pygame Surface for the map background (or a ChunkedSurface)
+            waypoint_link_distance: Optional distance for extra links between
+                nearby waypoints in the navigation graph
         """
         self.waypoints = []
+        self.waypoint_index = PointGrid()
+        self.waypoint_polylines = []
+        self.waypoint_link_distance = waypoint_link_distance
+        self.waypoint_graph = None
         self.level_data = data
         self.image = map_image
 
@@ -19,6 +30,10 @@ class World():
         self.spawn_points = []
         self.treasure_locations = []
         self.enemy_spawn_points = []
+        self.tiles = None
+        self.tile_size = 32
+        # Binary level backing the tiles, kept open while the world uses it
+        self.level = None
         self.width = map_image.get_width() if map_image else 0
         self.height = map_image.get_height() if map_image else 0
 
@@ -59,6 +74,9 @@ class World():
                 # Handle custom format with direct waypoints
                 elif "waypoints" in self.level_data:
                     self.waypoints = self.level_data["waypoints"]
+                    self.waypoint_index.build(self.waypoints)
+                    self.waypoint_polylines = self.level_data.get(
+                        "waypoint_polylines", [list(range(len(self.waypoints)))])
 
                 # Handle spawn points in custom format
                 if "spawn_points" in self.level_data:
@@ -67,25 +85,44 @@ class World():
                 if "enemy_spawns" in self.level_data:
                     self.enemy_spawn_points = self.level_data["enemy_spawns"]
 
+                # Tile grid rows as produced by create_dungeon_map
+                if "tiles" in self.level_data:
+                    self.tiles = self.level_data["tiles"]
+                    self.tile_size = self.level_data.get("tile_size", self.tile_size)
+
             else:
                 print("Warning: level_data is not a dictionary format")
         except (KeyError, TypeError) as e:
             print(f"Error processing data: {e}")
             print("Using default empty waypoints")
 
+        self.build_waypoint_graph()
+
     def process_waypoints(self, data):
         """Iterate through waypoints to extract individual sets of x and y coordinates"""
+        # Each polyline is kept as its own chain in the navigation graph
+        polyline = []
+        self.waypoint_polylines.append(polyline)
         try:
             for point in data:
                 temp_x = point.get("x", 0)
                 temp_y = point.get("y", 0)
+                self.waypoint_index.insert(len(self.waypoints), temp_x, temp_y)
+                polyline.append(len(self.waypoints))
                 self.waypoints.append((temp_x, temp_y))
         except (AttributeError, TypeError) as e:
             print(f"Error processing waypoints: {e}")
+        self.waypoint_graph = None
 
     def draw(self, surface, camera_x=0, camera_y=0):
         """Draw the world with optional camera offset"""
-        surface.blit(self.image, (-camera_x, -camera_y))
+        if isinstance(self.image, pg.Surface):
+            # Only the part of the map under the view is copied
+            view = (int(camera_x), int(camera_y), surface.get_width(), surface.get_height())
+            surface.blit(self.image, (0, 0), view)
+        else:
+            # Chunked map images draw only the part around the camera
+            self.image.draw(surface, camera_x, camera_y)
 
     def draw_waypoints(self, surface, camera_x=0, camera_y=0, color=(255, 255, 0), radius=5):
         """Draw waypoints for debugging/visualization"""
@@ -103,8 +140,7 @@ class World():
                 pg.draw.circle(surface, (0, 0, 0), (screen_x, screen_y), radius + 1, 1)
 
                 # Optionally draw waypoint number
-                font = pg.font.SysFont(None, 20)
-                text = font.render(str(i), True, (255, 255, 255))
+                text = render_text(str(i), (255, 255, 255), size=20)
                 text_rect = text.get_rect(center=(screen_x, screen_y - radius - 10))
                 surface.blit(text, text_rect)
 
@@ -143,8 +179,13 @@ class World():
         return self.enemy_spawn_points
 
     def add_waypoint(self, x, y):
-        """Manually add a waypoint"""
+        """Manually add a waypoint, continuing the last waypoint chain"""
+        if not self.waypoint_polylines:
+            self.waypoint_polylines.append([])
+        self.waypoint_index.insert(len(self.waypoints), x, y)
+        self.waypoint_polylines[-1].append(len(self.waypoints))
         self.waypoints.append((x, y))
+        self.waypoint_graph = None
 
     def add_spawn_point(self, x, y):
         """Manually add a spawn point"""
@@ -157,6 +198,9 @@ class World():
     def clear_waypoints(self):
         """Clear all waypoints"""
         self.waypoints = []
+        self.waypoint_index.clear()
+        self.waypoint_polylines = []
+        self.waypoint_graph = None
 
     def clear_spawn_points(self):
         """Clear all spawn points"""
@@ -176,44 +220,69 @@ class World():
         Returns:
             Tuple of (waypoint, distance, index) or None if no waypoints
         """
-        if not self.waypoints:
+        nearest = self.waypoint_index.nearest(pos)
+        if nearest is None:
             return None
 
-        min_distance = float('inf')
-        nearest_waypoint = None
-        nearest_index = -1
+        index, distance = nearest
+        return (self.waypoints[index], distance, index)
 
-        for i, waypoint in enumerate(self.waypoints):
-            dx = waypoint[0] - pos[0]
-            dy = waypoint[1] - pos[1]
-            distance = (dx ** 2 + dy ** 2) ** 0.5
+    def get_nearest_waypoints(self, pos, k):
+        """
+        Find the k nearest waypoints to a given position
+
+        Args:
+            pos: Tuple (x, y) of the position to check
+            k: Number of waypoints to return
+
+        Returns:
+            List of (waypoint, distance, index) tuples, closest first
+        """
+        return [(self.waypoints[index], distance, index)
+                for index, distance in self.waypoint_index.k_nearest(pos, k)]
+
+    def get_waypoints_in_radius(self, pos, radius):
+        """
+        Find all waypoints within a radius of a given position
+
+        Args:
+            pos: Tuple (x, y) of the position to check
+            radius: Search radius in pixels
+
+        Returns:
+            List of (waypoint, distance, index) tuples, closest first
+        """
+        return [(self.waypoints[index], distance, index)
+                for index, distance in self.waypoint_index.within_radius(pos, radius)]
 
-            if distance < min_distance:
-                min_distance = distance
-                nearest_waypoint = waypoint
-                nearest_index = i
+    def build_waypoint_graph(self):
+        """Build the waypoint navigation graph from polylines and nearby links"""
+        self.waypoint_graph = WaypointGraph(self.waypoints, self.waypoint_polylines,
+                                            self.waypoint_link_distance, self.waypoint_index)
+        return self.waypoint_graph
 
-        return (nearest_waypoint, min_distance, nearest_index)
+    def get_waypoint_graph(self):
+        """Return the navigation graph, rebuilding it if waypoints changed"""
+        if self.waypoint_graph is None:
+            self.build_waypoint_graph()
+        return self.waypoint_graph
 
     def get_waypoint_path(self, start_index, end_index):
         """
-        Get a path of waypoints from start to end index
+        Get the shortest path of waypoints from start to end index
 
         Args:
             start_index: Starting waypoint index
             end_index: Ending waypoint index
 
         Returns:
-            List of waypoints forming the path
+            List of waypoints forming the path, or [] if there is no path
         """
-        if start_index < 0 or end_index >= len(self.waypoints):
+        if not (0 <= start_index < len(self.waypoints) and 0 <= end_index < len(self.waypoints)):
             return []
 
-        if start_index <= end_index:
-            return self.waypoints[start_index:end_index + 1]
-        else:
-            # Wrap around if needed
-            return self.waypoints[start_index:] + self.waypoints[:end_index + 1]
+        path = self.get_waypoint_graph().get_path(start_index, end_index)
+        return [self.waypoints[i] for i in path]
 
     def is_position_valid(self, x, y):
         """
@@ -236,11 +305,15 @@ class World():
         """
         data = {
             "waypoints": self.waypoints,
+            "waypoint_polylines": self.waypoint_polylines,
             "spawn_points": self.spawn_points,
             "enemy_spawns": self.enemy_spawn_points,
             "width": self.width,
             "height": self.height
         }
+        if self.tiles:
+            data["tiles"] = list(self.tiles)
+            data["tile_size"] = self.tile_size
 
         try:
             with open(filename, 'w') as f:
@@ -270,6 +343,74 @@ class World():
             print(f"Error loading world data: {e}")
             return World({}, map_image)
 
+    def save_binary(self, filename):
+        """
+        Save world data, including the tile grid, in the compact binary format
+
+        Args:
+            filename: Path to save file
+        """
+        try:
+            level_format.save_level(filename, self.tiles or [], self.tile_size, self.waypoints,
+                                    self.waypoint_polylines, self.spawn_points,
+                                    self.enemy_spawn_points, self.width, self.height)
+            print(f"World data saved to {filename}")
+        except Exception as e:
+            print(f"Error saving world data: {e}")
+
+    def tile_at(self, col, row):
+        """Return the tile character at a grid position, or None without a tile grid"""
+        if self.level is not None:
+            return self.level.tile_at(col, row)
+        if self.tiles:
+            return self.tiles[row][col]
+        return None
+
+    def create_collision_grid(self, solid_tiles=WALL_TILES):
+        """Build a CollisionGrid from the tile grid, straight from the buffer of a binary level"""
+        if self.level is not None:
+            return CollisionGrid.from_level(self.level, solid_tiles)
+        return CollisionGrid.from_map(self.tiles or [], self.tile_size, solid_tiles)
+
+    def close(self):
+        """Release the memory map of a binary level"""
+        if self.level is not None:
+            # Drop every view of the map first, or it cannot be closed
+            self.tiles = None
+            self.level_data = None
+            self.level.close()
+            self.level = None
+
+    @staticmethod
+    def load_binary(filename, map_image):
+        """
+        Load world data from the binary format through a memory map
+
+        The level stays mapped: tile rows are decoded only when read and
+        create_collision_grid works on the tile buffer directly. Call close()
+        when done with the world.
+
+        Args:
+            filename: Path to load file
+            map_image: pygame Surface for the map
+
+        Returns:
+            World instance
+        """
+        try:
+            level = level_format.load_level(filename)
+            try:
+                world = World(level.to_dict(), map_image)
+            except Exception:
+                level.close()
+                raise
+            world.level = level
+            print(f"World data loaded from {filename}")
+            return world
+        except Exception as e:
+            print(f"Error loading world data: {e}")
+            return World({}, map_image)
+
 
 # Test and example usage
 def create_test_world():